@@ -7,9 +7,10 @@ Memos to surface potential duplicates together with reasoning.
 
 from __future__ import annotations
 
+import hashlib
 import json
 import re
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
@@ -18,6 +19,11 @@ from sqlalchemy.orm import joinedload
 
 from ..models import Memos, Dealer
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+
 DATE_FORMATS: Tuple[str, ...] = (
     "%Y-%m-%d",
     "%d/%m/%Y",
@@ -30,6 +36,17 @@ DATE_FORMATS: Tuple[str, ...] = (
     "%B %d, %Y",
 )
 
+# The numeric DATE_FORMATS layouts are matched with one regex and built directly;
+# only the month-name layouts still go through strptime.
+_NUMERIC_DATE_RE = re.compile(r"(\d{4})([-/])(\d{1,2})\2(\d{1,2})|(\d{1,2})([-/.])(\d{1,2})\6(\d{4})")
+_TEXT_DATE_FORMATS: Tuple[str, ...] = tuple(fmt for fmt in DATE_FORMATS if "%b" in fmt or "%B" in fmt)
+
+_NON_ALNUM_RE = re.compile(r"[^A-Z0-9]")
+# str.translate table deleting every ASCII character outside [A-Z0-9].
+_NON_ALNUM_ASCII = {code: None for code in range(128) if not (48 <= code <= 57 or 65 <= code <= 90)}
+_WHITESPACE_RE = re.compile(r"\s+")
+_PO_SPLIT_RE = re.compile(r"[;,]")
+
 
 def _first_not_none(*values: Any) -> Any:
     for value in values:
@@ -51,25 +68,48 @@ def _normalise_text(value: Any, *, upper: bool = False, lower: bool = False) ->
     return text
 
 
+def _strip_non_alnum(text: str) -> str:
+    if text.isascii():
+        return text.translate(_NON_ALNUM_ASCII)
+    return _NON_ALNUM_RE.sub("", text)
+
+
 def _normalise_Memos_number(value: Any) -> Optional[str]:
     text = _normalise_text(value, upper=True)
     if not text:
         return None
-    return re.sub(r"[^A-Z0-9]", "", text)
+    return _strip_non_alnum(text)
 
 
 def _normalise_gstin(value: Any) -> Optional[str]:
     text = _normalise_text(value, upper=True)
     if not text:
         return None
-    return re.sub(r"\s+", "", text)
+    return _WHITESPACE_RE.sub("", text)
+
+
+def _parse_numeric_date(text: str) -> Optional[date]:
+    match = _NUMERIC_DATE_RE.fullmatch(text)
+    if match is None:
+        return None
+    if match.group(1):
+        year, month, day = match.group(1, 3, 4)
+    else:
+        day, month, year = match.group(5, 7, 8)
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
 
 
 def _normalise_date(value: Any) -> Optional[str]:
     text = _normalise_text(value)
     if not text:
         return None
-    for fmt in DATE_FORMATS:
+    parsed = _parse_numeric_date(text)
+    if parsed is not None:
+        return parsed.isoformat()
+    for fmt in _TEXT_DATE_FORMATS:
         try:
             return datetime.strptime(text, fmt).date().isoformat()
         except ValueError:
@@ -116,7 +156,7 @@ def _normalise_po_numbers(values: Any) -> Tuple[Set[str], Dict[str, str], List[s
     if values is None:
         return normals, mapping, display
     if isinstance(values, str):
-        parts: Iterable[Any] = re.split(r"[;,]", values)
+        parts: Iterable[Any] = _PO_SPLIT_RE.split(values)
     elif isinstance(values, Sequence) and not isinstance(values, (bytes, bytearray)):
         parts = values
     else:
@@ -128,7 +168,7 @@ def _normalise_po_numbers(values: Any) -> Tuple[Set[str], Dict[str, str], List[s
         if not text:
             continue
         display.append(text)
-        normalised = re.sub(r"[^A-Z0-9]", "", text.upper())
+        normalised = _strip_non_alnum(text.upper())
         if not normalised:
             continue
         normals.add(normalised)
@@ -136,7 +176,7 @@ def _normalise_po_numbers(values: Any) -> Tuple[Set[str], Dict[str, str], List[s
     return normals, mapping, display
 
 
-def _canonical_line_items(items: Any) -> Tuple[Optional[str], int]:
+def _canonical_line_items(items: Any) -> Tuple[Optional[bytes], int]:
     if not isinstance(items, Sequence) or isinstance(items, (str, bytes, bytearray)):
         return None, 0
     normalised: List[Dict[str, Optional[str]]] = []
@@ -163,7 +203,13 @@ def _canonical_line_items(items: Any) -> Tuple[Optional[str], int]:
         entry["hsn"],
         entry["sku"],
     ))
-    return json.dumps(normalised, sort_keys=True, ensure_ascii=False), len(normalised)
+    # both encoders must yield identical bytes: the digest is stored and matched
+    if orjson is not None:
+        blob = orjson.dumps(normalised, option=orjson.OPT_SORT_KEYS)
+    else:
+        blob = json.dumps(normalised, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    # Signatures are only compared for equality, so keep a 16-byte digest per snapshot.
+    return hashlib.blake2b(blob, digest_size=16).digest(), len(normalised)
 
 
 def _to_checked_values(values: Dict[str, Any]) -> Dict[str, Optional[str]]:
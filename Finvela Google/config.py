@@ -82,9 +82,16 @@ class BaseConfig:
 
     CACHE_TYPE = "SimpleCache"
     CACHE_DEFAULT_TIMEOUT = 300
+    # Seconds a duplicate check may reuse its candidate list; 0 disables the cache.
+    # Ignored unless CACHE_TYPE is shared between processes (e.g. RedisCache).
+    DUPLICATE_CANDIDATE_CACHE_TTL_SECS = int(os.getenv("DUPLICATE_CANDIDATE_CACHE_TTL_SECS", "60"))
 
     RATELIMIT_HEADERS_ENABLED = True
     RATELIMIT_DEFAULT = "100 per minute"
+    # Point this at Redis (e.g. ``REDIS_URL``) when running more than one worker so
+    # counters are shared and incremented atomically server-side.
+    RATELIMIT_STORAGE_URI = os.getenv("RATELIMIT_STORAGE_URI", "memory://")
+    RATELIMIT_STRATEGY = os.getenv("RATELIMIT_STRATEGY", "moving-window")
 
     SECURITY_HEADERS = True
     CONTENT_SECURITY_POLICY: Dict[str, str] = {
@@ -101,6 +108,7 @@ class BaseConfig:
 
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
     LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+    LOG_QUEUE_MAXLEN = int(os.getenv("LOG_QUEUE_MAXLEN", "20000"))
     REQUEST_BODY_LOG_MAX = int(os.getenv("REQUEST_BODY_LOG_MAX", "2048"))
     REDACT_KEYS = _split(
         os.getenv("REDACT_KEYS"),
@@ -280,6 +288,7 @@ class BaseConfig:
 
     OTP_EXPIRY_MINUTES = int(os.getenv("OTP_EXPIRY_MINUTES", "10"))
     OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+    OTP_PEPPER = os.getenv("OTP_PEPPER")  # defaults to SECRET_KEY when unset
     RESEND_THROTTLE_SECONDS = int(os.getenv("RESEND_THROTTLE_SECONDS", "60"))
 
 class DevConfig(BaseConfig):
@@ -300,4 +309,6 @@ class ProdConfig(BaseConfig):
     REMEMBER_COOKIE_SECURE = True
     PREFERRED_URL_SCHEME = "https"
     RATELIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "60 per minute")
+    RATELIMIT_STORAGE_URI = os.getenv("RATELIMIT_STORAGE_URI", BaseConfig.REDIS_URL)
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = True
     CACHE_TYPE = os.getenv("CACHE_TYPE", "SimpleCache")
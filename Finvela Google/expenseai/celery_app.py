@@ -49,7 +49,7 @@ def make_celery(app: Flask | None = None) -> Celery:
     celery.Task = AppContextTask  # type: ignore[assignment]
     celery.flask_app = app  # type: ignore[attr-defined]
 
-    celery.autodiscover_tasks(["expenseai_ingest"])
+    celery.autodiscover_tasks(["expenseai_ingest", "expenseai_benchmark"])
     app.extensions["celery"] = celery
     return celery
 
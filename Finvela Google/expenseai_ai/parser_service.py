@@ -13,6 +13,7 @@ from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 
 from expenseai_ai import gemini_client
+from expenseai_ai.embeddings import normalize_for_embedding
 from expenseai_ai.norm import norm_currency, norm_gst, parse_iso_date, to_decimal
 from expenseai_ai.schemas import ParseResult
 from expenseai_ext.db import db
@@ -278,6 +279,8 @@ def parse_invoice_sync(invoice_id: int, *, actor: str = "cli") -> Dict[str, Any]
 
 def parse_and_persist(invoice: Invoice) -> Dict[str, Any]:
     """Invoke Gemini, validate the payload, and store structured results."""
+    from expenseai_invoices.duplicate_detection import refresh_duplicate_snapshot
+
     app = current_app
     storage_root = Path(app.instance_path) / app.config["UPLOAD_STORAGE_DIR"]
     relative_path = invoice.source_path or invoice.stored_filename
@@ -346,6 +349,7 @@ def parse_and_persist(invoice: Invoice) -> Dict[str, Any]:
             line_no=item.line_no,
             description_raw=item.description_raw,
             description_norm=None,
+            description_norm_canonical=normalize_for_embedding(item.description_raw or "") or None,
             hsn_sac=item.hsn_sac,
             qty=to_decimal(item.qty),
             unit_price=to_decimal(item.unit_price),
@@ -358,6 +362,8 @@ def parse_and_persist(invoice: Invoice) -> Dict[str, Any]:
         db.session.add(line_item)
         line_items_created += 1
 
+    refresh_duplicate_snapshot(invoice)
+
     summary = {
         "header_confidence_mean": invoice.extraction_confidence,
         "line_items": line_items_created,
@@ -4,10 +4,11 @@ from __future__ import annotations
 import hashlib
 import hmac
 import secrets
+import threading
 from datetime import datetime, timedelta
 from typing import Any, Tuple
 
-from flask import current_app
+from flask import current_app, g
 
 from expenseai_ext.db import db
 from expenseai_models.audit import AuditLog
@@ -39,38 +40,84 @@ class OtpValidationError(OtpError):
     """Raised when the supplied code does not match the hash."""
 
 
-_HASH_PREFIX = "pbkdf2_sha256"
-_HASH_ITERATIONS = 200_000
+_HASH_PREFIX = "blake2b"
+_LEGACY_HASH_PREFIX = "pbkdf2_sha256"
+_DIGEST_SIZE = 32
+_CODE_LENGTH = 6
+
+_hasher_local = threading.local()
+
+
+def _pepper() -> bytes:
+    """Return the server-side key used for keyed OTP hashing (max 64 bytes for BLAKE2b)."""
+    secret = current_app.config.get("OTP_PEPPER") or current_app.config.get("SECRET_KEY") or ""
+    raw = secret.encode("utf-8") if isinstance(secret, str) else bytes(secret)
+    if len(raw) > hashlib.blake2b.MAX_KEY_SIZE:
+        raw = hashlib.sha512(raw).digest()
+    return raw
+
+
+def _keyed_hasher() -> "hashlib.blake2b":
+    """Return a fresh keyed BLAKE2b hasher cloned from a per-thread prototype."""
+    pepper = _pepper()
+    cached = getattr(_hasher_local, "prototype", None)
+    if cached is None or cached[0] != pepper:
+        cached = (pepper, hashlib.blake2b(key=pepper, digest_size=_DIGEST_SIZE))
+        _hasher_local.prototype = cached
+    return cached[1].copy()
 
 
 def _hash_code(code: str) -> str:
-    """Hash an OTP value using PBKDF2-HMAC-SHA256."""
+    """Hash an OTP value using salted, keyed BLAKE2b."""
     salt = secrets.token_bytes(16)
-    digest = hashlib.pbkdf2_hmac("sha256", code.encode("utf-8"), salt, _HASH_ITERATIONS)
-    return f"{_HASH_PREFIX}${_HASH_ITERATIONS}${salt.hex()}${digest.hex()}"
+    hasher = _keyed_hasher()
+    hasher.update(salt)
+    hasher.update(code.encode("utf-8"))
+    return f"{_HASH_PREFIX}${salt.hex()}${hasher.hexdigest()}"
 
 
 def _verify_code(code: str, stored: str) -> bool:
     """Compare an OTP against its stored hash in constant time."""
+    # The code format is public, so rejecting malformed input early leaks nothing
+    # about the secret while skipping the hash work for garbage submissions.
+    if len(code) != _CODE_LENGTH or not (code.isascii() and code.isdigit()):
+        return False
     try:
-        prefix, iter_str, salt_hex, digest_hex = stored.split("$")
-        if prefix != _HASH_PREFIX:
+        prefix, *parts = stored.split("$")
+        if prefix == _HASH_PREFIX:
+            salt_hex, digest_hex = parts
+            iterations = 0
+        elif prefix == _LEGACY_HASH_PREFIX:
+            iter_str, salt_hex, digest_hex = parts
+            iterations = int(iter_str)
+        else:
             return False
-        iterations = int(iter_str)
         salt = bytes.fromhex(salt_hex)
         expected = bytes.fromhex(digest_hex)
     except (ValueError, TypeError):  # pragma: no cover - defensive parsing
         return False
-    computed = hashlib.pbkdf2_hmac("sha256", code.encode("utf-8"), salt, iterations)
+    if prefix == _LEGACY_HASH_PREFIX:
+        # Records issued before the keyed scheme remain valid until they expire.
+        computed = hashlib.pbkdf2_hmac("sha256", code.encode("utf-8"), salt, iterations)
+    else:
+        hasher = _keyed_hasher()
+        hasher.update(salt)
+        hasher.update(code.encode("utf-8"))
+        computed = hasher.digest()
     return hmac.compare_digest(expected, computed)
 
 
 def _now() -> datetime:
-    return datetime.utcnow()
+    """Return a timestamp shared by every OTP check within the current app context."""
+    now = getattr(g, "_otp_now", None)
+    if now is None:
+        now = datetime.utcnow()
+        g._otp_now = now
+    return now
 
 
 def _issue_code() -> str:
-    return f"{secrets.randbelow(1_000_000):06d}"
+    return f"{secrets.randbelow(10 ** _CODE_LENGTH):0{_CODE_LENGTH}d}"
 
 
 def _expiry_timestamp() -> datetime:
@@ -9,6 +9,8 @@ from datetime import datetime, timedelta
 from typing import Iterable, Optional
 
 from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 
 from expenseai_ext.db import db
 from expenseai_models.audit import AuditLog
@@ -72,6 +74,16 @@ class UserService:
         return role
 
 
+class _SlugTranslation(dict):
+    """``str.translate`` table mapping anything outside ``[a-z0-9]`` to ``-``."""
+
+    def __missing__(self, codepoint: int) -> int:
+        char = chr(codepoint)
+        value = codepoint if ("a" <= char <= "z" or "0" <= char <= "9") else ord("-")
+        self[codepoint] = value
+        return value
+
+
 @dataclass(frozen=True)
 class OrganizationUsageSummary:
     """Aggregated view of membership usage for an organization."""
@@ -91,7 +103,9 @@ class OrganizationUsageSummary:
 class OrganizationService:
     """Helpers for tenant organizations, invites and member approvals."""
 
-    _SLUG_PATTERN = re.compile(r"[^a-z0-9]+")
+    _SLUG_TRANSLATION = _SlugTranslation()
+    _DASH_RUN_PATTERN = re.compile(r"-{2,}")
+    _INVITE_CODE_ATTEMPTS = 5
     LIMIT_REACHED_MESSAGE = "You’ve reached the free user limit. Please upgrade your plan to add more users."
 
     @staticmethod
@@ -131,7 +145,11 @@ class OrganizationService:
     def list_invites(organization: Organization) -> list[RegistrationInvite]:
         """Return the organization's invites ordered by creation time."""
         return (
-            RegistrationInvite.query.filter_by(organization_id=organization.id)
+            RegistrationInvite.query.options(
+                selectinload(RegistrationInvite.created_by),
+                selectinload(RegistrationInvite.organization),
+            )
+            .filter_by(organization_id=organization.id)
             .order_by(RegistrationInvite.created_at.desc())
             .all()
         )
@@ -204,7 +222,6 @@ class OrganizationService:
             raise ValueError("Admin must belong to an organization to issue invites")
         OrganizationService.ensure_can_add_members(admin.organization)
         length = max(6, int(current_app.config.get("INVITE_CODE_LENGTH", 12)))
-        code = OrganizationService._generate_unique_code(length)
         if expires_in_hours is None:
             default_hours = current_app.config.get("INVITE_CODE_EXPIRY_HOURS")
             expires_in_hours = int(default_hours) if default_hours else None
@@ -215,13 +232,25 @@ class OrganizationService:
             configured_max = current_app.config.get("INVITE_CODE_MAX_USES")
             max_uses = int(configured_max) if configured_max else None
         invite = RegistrationInvite(
-            code=code,
+            code=OrganizationService._generate_unique_code(length),
             organization=admin.organization,
             created_by=admin,
             expires_at=expiry,
             max_uses=max_uses,
         )
-        db.session.add(invite)
+        # Rely on the unique index on ``code``: insert optimistically and only
+        # regenerate on the (rare) collision instead of probing beforehand.
+        for attempt in range(OrganizationService._INVITE_CODE_ATTEMPTS):
+            try:
+                with db.session.begin_nested():
+                    db.session.add(invite)
+                    db.session.flush()
+                break
+            except IntegrityError:
+                if attempt + 1 >= OrganizationService._INVITE_CODE_ATTEMPTS:
+                    db.session.rollback()
+                    raise ValueError("Unable to generate a unique invite code; please try again")
+                invite.code = OrganizationService._generate_unique_code(length)
         db.session.commit()
         AuditLog.log(
             action="invite_created",
@@ -257,21 +286,27 @@ class OrganizationService:
 
     @staticmethod
     def _generate_unique_slug(name: str) -> str:
-        base = OrganizationService._SLUG_PATTERN.sub("-", name.lower()).strip("-") or "org"
+        dashed = name.lower().translate(OrganizationService._SLUG_TRANSLATION)
+        base = OrganizationService._DASH_RUN_PATTERN.sub("-", dashed).strip("-") or "org"
+        # ``base`` only contains [a-z0-9-], so it is safe to use as a LIKE prefix.
+        taken = {
+            slug
+            for (slug,) in Organization.query.with_entities(Organization.slug)
+            .filter(Organization.slug.like(f"{base}%"))
+            .all()
+        }
         slug = base
         suffix = 1
-        while Organization.query.filter_by(slug=slug).first() is not None:
+        while slug in taken:
             slug = f"{base}-{suffix}"
             suffix += 1
         return slug
 
     @staticmethod
     def _generate_unique_code(length: int) -> str:
+        """Return a random invite code; uniqueness is enforced on insert."""
         alphabet = string.ascii_uppercase + string.digits
-        while True:
-            candidate = "".join(secrets.choice(alphabet) for _ in range(length))
-            if not RegistrationInvite.query.filter_by(code=candidate).first():
-                return candidate
+        return "".join(secrets.choice(alphabet) for _ in range(length))
 
     @staticmethod
     def default_user_limit() -> int:
@@ -0,0 +1,143 @@
+"""Parsing and persistence for external benchmark catalog CSVs."""
+from __future__ import annotations
+
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import BinaryIO
+
+from flask import current_app
+
+from expenseai_ai.embeddings import normalize_for_embedding
+from expenseai_ext.csv_rows import iter_csv_rows
+from expenseai_ext.db import db, dialect_name, has_index, pg_upsert
+from expenseai_models.external_benchmark import ExternalBenchmark
+
+_INGEST_BATCH_SIZE = 500
+
+_BenchmarkKey = tuple[str, str | None, str | None, date | None]
+_KEY_COLUMNS = ("text_norm", "currency", "source", "effective_from")
+CSV_COLUMNS: tuple[str, ...] = (
+    "text_norm",
+    "currency",
+    "median_price",
+    "mad",
+    "n",
+    "source",
+    "effective_from",
+    "effective_to",
+)
+
+
+def ingest_csv(stream: BinaryIO) -> tuple[int, int]:
+    """Merge a binary CSV stream into the external benchmark catalog; returns (inserted, updated)."""
+    inserted = 0
+    updated = 0
+    batch: dict[_BenchmarkKey, dict[str, object]] = {}
+    for row in iter_csv_rows(stream, CSV_COLUMNS, required=CSV_COLUMNS):
+        text_norm_raw, currency_raw, median_raw, mad_raw, n_raw, source_raw, eff_from_raw, eff_to_raw = row
+        normalized = normalize_for_embedding(text_norm_raw.strip())
+        if not normalized:
+            current_app.logger.info(
+                "Skipping benchmark row without usable description",
+                extra={"row": dict(zip(CSV_COLUMNS, row))},
+            )
+            continue
+        currency = currency_raw.strip().upper() or None
+        try:
+            median_price = _dec_or_none(median_raw)
+            mad = _dec_or_none(mad_raw)
+        except (InvalidOperation, ValueError) as exc:
+            raise ValueError(f"Invalid numeric value for '{text_norm_raw}': {exc}") from exc
+        try:
+            sample_size = int(n_raw or 0)
+        except ValueError as exc:
+            raise ValueError(f"Invalid sample size for '{text_norm_raw}': {exc}") from exc
+        source = source_raw.strip() or None
+        eff_from = _parse_date(eff_from_raw)
+        eff_to = _parse_date(eff_to_raw)
+
+        key = (normalized, currency, source, eff_from)
+        if key in batch:
+            # A repeated key within the file overwrites the earlier row, as an update.
+            updated += 1
+        batch[key] = {
+            "text_norm": normalized,
+            "currency": currency,
+            "median_price": median_price,
+            "mad": mad,
+            "n": sample_size,
+            "source": source,
+            "effective_from": eff_from,
+            "effective_to": eff_to,
+        }
+        if len(batch) >= _INGEST_BATCH_SIZE:
+            batch_inserted, batch_updated = _apply_batch(batch)
+            inserted += batch_inserted
+            updated += batch_updated
+            batch = {}
+    if batch:
+        batch_inserted, batch_updated = _apply_batch(batch)
+        inserted += batch_inserted
+        updated += batch_updated
+    return inserted, updated
+
+
+def _apply_batch(batch: dict[_BenchmarkKey, dict[str, object]]) -> tuple[int, int]:
+    """Upsert one batch of parsed rows, server-side on PostgreSQL when possible."""
+    # ON CONFLICT needs the unique key index, which older databases only get
+    # from ``flask manage create-unique-indexes``
+    if dialect_name() == "postgresql" and has_index(ExternalBenchmark.__tablename__, "uq_external_benchmark_key"):
+        # NULLs never conflict in a unique index, so only fully keyed rows can use ON CONFLICT.
+        keyed = {key: payload for key, payload in batch.items() if None not in key}
+        inserted, updated = pg_upsert(ExternalBenchmark, list(keyed.values()), conflict_columns=_KEY_COLUMNS)
+        remainder = {key: payload for key, payload in batch.items() if key not in keyed}
+        if remainder:
+            rest_inserted, rest_updated = _merge_batch(remainder)
+            inserted += rest_inserted
+            updated += rest_updated
+        return inserted, updated
+    return _merge_batch(batch)
+
+
+def _merge_batch(batch: dict[_BenchmarkKey, dict[str, object]]) -> tuple[int, int]:
+    """Insert or update one batch of parsed rows using a single prefetch query."""
+    # Match on text_norm in SQL and resolve the full key in Python so that NULL
+    # currency/source/effective_from values compare equal, as filter_by(None) did.
+    existing: dict[_BenchmarkKey, ExternalBenchmark] = {}
+    candidates = (
+        ExternalBenchmark.query.filter(ExternalBenchmark.text_norm.in_({key[0] for key in batch}))
+        .order_by(ExternalBenchmark.id.asc())
+        .all()
+    )
+    for record in candidates:
+        existing.setdefault((record.text_norm, record.currency, record.source, record.effective_from), record)
+
+    now = datetime.utcnow()
+    new_rows: list[dict[str, object]] = []
+    for key, payload in batch.items():
+        record = existing.get(key)
+        if record is None:
+            new_rows.append(payload)
+            continue
+        for field, value in payload.items():
+            setattr(record, field, value)
+        record.updated_at = now
+    if new_rows:
+        db.session.bulk_insert_mappings(ExternalBenchmark, new_rows)
+    return len(new_rows), len(batch) - len(new_rows)
+
+
+def _dec_or_none(value: str) -> Decimal | None:
+    return Decimal(value) if value else None
+
+
+def _parse_date(value: str | None) -> date | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.strip()).date()
+    except ValueError:
+        raise ValueError(f"Invalid date format: {value}. Expected YYYY-MM-DD.") from None
+
+
+__all__ = ["CSV_COLUMNS", "ingest_csv"]
@@ -0,0 +1,49 @@
+"""Celery tasks for loading external benchmark catalogs off the request path."""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+from celery.utils.log import get_task_logger
+
+from expenseai.celery_app import celery
+from expenseai_benchmark.catalog import ingest_csv
+from expenseai_benchmark.service import invalidate_external_norms
+from expenseai_ext.db import db
+from expenseai_models import AuditLog
+
+logger = get_task_logger(__name__)
+
+
+@celery.task(name="expenseai_benchmark.ingest_catalog", bind=True)
+def ingest_benchmarks_task(self, path: str, user_id: int | None = None) -> dict[str, Any]:
+    """Ingest a staged benchmark CSV in one transaction and remove the staged file."""
+    staged = Path(path)
+    try:
+        with staged.open("rb") as handle:
+            inserted, updated = ingest_csv(handle)
+        db.session.commit()
+        invalidate_external_norms()
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return {"status": "error", "message": "Could not decode file. Ensure it is UTF-8 encoded."}
+    except ValueError as exc:
+        db.session.rollback()
+        return {"status": "error", "message": str(exc)}
+    except Exception:
+        db.session.rollback()
+        logger.exception("Benchmark ingest failed", extra={"path": path})
+        raise
+    finally:
+        staged.unlink(missing_ok=True)
+
+    AuditLog.log(
+        action="benchmarks_upload",
+        entity="external_benchmark",
+        entity_id=None,
+        data={"inserted": inserted, "updated": updated, "user_id": user_id},
+    )
+    return {"status": "ok", "inserted": inserted, "updated": updated}
+
+
+__all__ = ["ingest_benchmarks_task"]
@@ -10,7 +10,8 @@ from flask_migrate import upgrade
 from expenseai_ai import parser_service
 from expenseai_auth.services import OrganizationService, UserService
 from expenseai_benchmark import service as benchmark_service
-from expenseai_ext.db import db
+from expenseai_ext.db import count_duplicate_keys, create_unique_index, db, missing_unique_indexes
+from expenseai_invoices.duplicate_detection import backfill_duplicate_snapshots
 from expenseai_models.invoice import Invoice
 from expenseai_models.user import User
 from expenseai_risk import orchestrator as risk_orchestrator
@@ -29,6 +30,27 @@ def init_db() -> None:
     click.echo("Database initialized via migrations.")
 
 
+@manage_cli.command("create-unique-indexes", help="Remove duplicate rows and build missing unique indexes")
+@click.option("--yes", is_flag=True, help="Delete duplicate rows without prompting")
+@with_appcontext
+def create_unique_indexes_cmd(yes: bool) -> None:
+    """Build unique indexes added after their tables were created; back up the database first."""
+    indexes = missing_unique_indexes()
+    if not indexes:
+        click.echo("All unique indexes are present.")
+        return
+    for index in indexes:
+        table_name = index.table.name
+        duplicates = count_duplicate_keys(index)
+        if duplicates and not yes:
+            click.confirm(
+                f"Delete {duplicates} duplicate rows from {table_name} (keeping the oldest per key) to build {index.name}?",
+                abort=True,
+            )
+        removed = create_unique_index(index)
+        click.secho(f"Created {index.name} on {table_name} ({removed} duplicate rows removed).", fg="green")
+
+
 @manage_cli.command("create-admin", help="Create an administrative user")
 @click.option("--email", prompt=True, help="Admin email address")
 @click.option("--name", prompt="Full name", help="Admin full name")
@@ -116,3 +138,12 @@ def backfill_history_cmd(days: int) -> None:
         processed += 1
     db.session.commit()
     click.secho(f"Benchmark history updated for {processed} invoices.", fg="green")
+
+
+@manage_cli.command("backfill-duplicate-snapshots", help="Store duplicate-detection snapshots for existing invoices")
+@click.option("--batch-size", type=int, default=200, show_default=True, help="Invoices per commit")
+@with_appcontext
+def backfill_duplicate_snapshots_cmd(batch_size: int) -> None:
+    """Persist snapshots for invoices parsed before snapshots were stored."""
+    updated = backfill_duplicate_snapshots(batch_size=batch_size)
+    click.secho(f"Duplicate snapshots stored for {updated} invoices.", fg="green")
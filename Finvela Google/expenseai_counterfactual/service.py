@@ -1,13 +1,19 @@
 """Business logic for counterfactual what-if evaluations."""
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Iterable, List
+from operator import attrgetter
+from typing import Any, Dict, List, Tuple
 
 from flask import current_app
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 
 from expenseai_benchmark import service as benchmark_service
+from expenseai_benchmark.models import BaselineResult
 from expenseai_compliance import arithmetic, hsn_service
 from expenseai_counterfactual.schemas import (
     CounterfactContributor,
@@ -21,9 +27,22 @@ from expenseai_ext.db import db
 from expenseai_models import AuditLog
 from expenseai_models.invoice import Invoice
 from expenseai_models.invoice_event import InvoiceEvent
-from expenseai_models.line_item import LineItem
 from expenseai_risk.engine import Contributor, collect_contributors, compute_composite
 
+_RISK_BEFORE_TTL = 60.0
+_RISK_BEFORE_CACHE_SIZE = 512
+
+# (contributors, composite, waterfall, policy_version) for the unmodified invoice.
+_RiskBefore = Tuple[List[Contributor], float, List[Dict[str, Any]], str]
+_risk_before_cache: dict[tuple[Any, ...], tuple[float, _RiskBefore]] = {}
+
+_LINE_CHANGES_ADAPTER = TypeAdapter(List[CounterfactLineChange])
+
+# Line fields each recomputed contributor depends on.
+_MARKET_FIELDS = frozenset({"qty", "unit_price"})
+_ARITHMETIC_FIELDS = frozenset({"qty", "unit_price", "gst_rate"})
+_HSN_FIELDS = frozenset({"hsn_sac", "gst_rate"})
+
 
 @dataclass(slots=True)
 class _LineSnapshot:
@@ -38,9 +57,27 @@ class _LineSnapshot:
     gst_rate: Decimal | None
 
 
+@dataclass(slots=True)
+class _LineTotals:
+    """A counterfactual line with its recomputed totals."""
+
+    line_no: int
+    description_raw: str
+    description_norm: str | None
+    hsn_sac: str | None
+    qty: Decimal
+    unit_price: Decimal
+    gst_rate: Decimal
+    line_subtotal: Decimal
+    line_tax: Decimal
+    line_total: Decimal
+
+
 def evaluate(invoice_id: int, payload: CounterfactRequest, *, actor: str) -> CounterfactResponse:
     """Perform counterfactual evaluation for the supplied invoice and request."""
-    invoice: Invoice | None = db.session.get(Invoice, invoice_id)
+    invoice: Invoice | None = db.session.execute(
+        select(Invoice).where(Invoice.id == invoice_id).options(selectinload(Invoice.line_items))
+    ).scalar_one_or_none()
     if invoice is None:
         raise ValueError(f"Invoice {invoice_id} not found")
 
@@ -48,11 +85,12 @@ def evaluate(invoice_id: int, payload: CounterfactRequest, *, actor: str) -> Cou
     if len(payload.line_changes) > max_lines:
         raise ValueError(f"Counterfactual limited to {max_lines} line adjustments")
 
-    max_delta_pct = Decimal(str(current_app.config.get("COUNTERFACT_MAX_DELTA_PCT", 0.5)))
+    max_delta_pct = float(current_app.config.get("COUNTERFACT_MAX_DELTA_PCT", 0.5))
     epsilon = Decimal(str(current_app.config.get("ARITH_EPSILON", 0.01)))
+    outlier_epsilon = float(current_app.config.get("OUTLIER_EPSILON", 0.01))
+    bench_lookback = int(current_app.config.get("BENCH_LOOKBACK_DAYS", 365))
 
-    line_map: dict[int, LineItem] = {line.line_no: line for line in invoice.line_items}
-    if not line_map:
+    if not invoice.line_items:
         raise ValueError("Invoice has no line items to adjust")
 
     # Freeze current totals for delta computation.
@@ -67,7 +105,8 @@ def evaluate(invoice_id: int, payload: CounterfactRequest, *, actor: str) -> Cou
     working_lines: List[_LineSnapshot] = []
     notes: List[str] = []
 
-    for line_no, model in sorted(line_map.items()):
+    for model in sorted(invoice.line_items, key=attrgetter("line_no")):
+        line_no = model.line_no
         snapshot = _LineSnapshot(
             line_no=line_no,
             description_raw=model.description_raw,
@@ -83,7 +122,8 @@ def evaluate(invoice_id: int, payload: CounterfactRequest, *, actor: str) -> Cou
         working_lines.append(snapshot)
 
     recomputed_lines = _recompute_line_totals(working_lines)
-    subtotal_after, tax_after, grand_after = _aggregate_totals(recomputed_lines)
+    totals_expected = _aggregate_totals(recomputed_lines)
+    subtotal_after, tax_after, grand_after = totals_expected
 
     totals_after = CounterfactTotals(
         subtotal=subtotal_after,
@@ -96,14 +136,17 @@ def evaluate(invoice_id: int, payload: CounterfactRequest, *, actor: str) -> Cou
         grand_total=grand_after - before_totals.grand_total,
     )
 
-    contributors_before = collect_contributors(invoice.id)
-    composite_before, waterfall_before, policy_version = compute_composite(contributors_before)
+    contributors_before, composite_before, waterfall_before, policy_version = _risk_before(invoice)
 
     contributors_after, hsn_mismatches = _build_counterfactual_contributors(
         invoice,
         recomputed_lines,
+        totals_expected,
         contributors_before,
         epsilon,
+        changed_fields=_changed_fields(payload.line_changes),
+        outlier_epsilon=outlier_epsilon,
+        lookback=bench_lookback,
     )
     composite_after, waterfall_after, policy_version_after = compute_composite(contributors_after)
 
@@ -129,14 +172,16 @@ def evaluate(invoice_id: int, payload: CounterfactRequest, *, actor: str) -> Cou
             "delta_composite": float(delta_composite),
             "notes": notes,
         },
+        flush=False,
     )
+    # AuditLog.log commits, flushing the event and the audit row together.
     AuditLog.log(
         action="counterfact_evaluated",
         entity="invoice",
         entity_id=invoice.id,
         data={
             "actor": actor,
-            "changes": [change.model_dump() for change in payload.line_changes],
+            "changes": _LINE_CHANGES_ADAPTER.dump_python(payload.line_changes, exclude_none=True),
             "delta_totals": {
                 "subtotal": float(totals_delta.subtotal),
                 "tax_total": float(totals_delta.tax_total),
@@ -158,10 +203,31 @@ def evaluate(invoice_id: int, payload: CounterfactRequest, *, actor: str) -> Cou
     )
 
 
+def _risk_before(invoice: Invoice) -> _RiskBefore:
+    """Return the invoice's current contributors and composite, cached briefly.
+
+    The key includes the pipeline timestamps and statuses so a reprocessed
+    invoice misses the cache; the TTL bounds staleness from anything else
+    (policy weights, new price history) while a user iterates on edits.
+    """
+    key = (invoice.id, invoice.extracted_at, invoice.compliance_status, invoice.risk_status)
+    now = time.monotonic()
+    cached = _risk_before_cache.get(key)
+    if cached is not None and now - cached[0] < _RISK_BEFORE_TTL:
+        return cached[1]
+    contributors = collect_contributors(invoice.id)
+    composite, waterfall, policy_version = compute_composite(contributors)
+    result = (contributors, composite, waterfall, policy_version)
+    if len(_risk_before_cache) >= _RISK_BEFORE_CACHE_SIZE:
+        _risk_before_cache.clear()
+    _risk_before_cache[key] = (now, result)
+    return result
+
+
 def _apply_change(
     snapshot: _LineSnapshot,
     change: CounterfactLineChange,
-    max_delta_pct: Decimal,
+    max_delta_pct: float,
     notes: List[str],
 ) -> _LineSnapshot:
     source_line = snapshot.line_no
@@ -179,90 +245,162 @@ def _apply_change(
     return snapshot
 
 
-def _validate_delta(existing: Decimal | None, new_value: Decimal, limit_pct: Decimal, label: str) -> None:
+def _changed_fields(changes: List[CounterfactLineChange]) -> frozenset[str]:
+    return frozenset(
+        field
+        for change in changes
+        for field in ("qty", "unit_price", "gst_rate", "hsn_sac")
+        if getattr(change, field) is not None
+    )
+
+
+def _validate_delta(existing: Decimal | None, new_value: Decimal, limit_pct: float, label: str) -> None:
+    # The guardrail is a coarse percentage test, so float precision is ample here;
+    # the snapshot itself keeps the exact Decimal value.
     if existing is None:
         return
-    if existing == 0:
+    current = float(existing)
+    proposed = float(new_value)
+    if current == 0.0:
         # Allow adjustments from zero but guard against runaway values using limit as absolute multiplier.
-        if new_value.copy_abs() > limit_pct * Decimal(1000):  # arbitrary safety for zero baselines
+        if abs(proposed) > limit_pct * 1000:  # arbitrary safety for zero baselines
             raise ValueError(f"Change for {label} exceeds guardrail for zero baseline")
         return
-    delta = (Decimal(new_value) - existing).copy_abs()
-    pct = delta / existing.copy_abs()
-    if pct > limit_pct:
+    if abs(proposed - current) > limit_pct * abs(current):
         raise ValueError(f"Change for {label} exceeds {limit_pct * 100:.0f}% limit")
 
 
-def _recompute_line_totals(lines: Iterable[_LineSnapshot]) -> list[dict[str, Decimal | int | str | None]]:
-    recomputed: list[dict[str, Decimal | int | str | None]] = []
-    for entry in lines:
-        subtotal, tax, total = arithmetic.recompute_line_totals(entry.qty, entry.unit_price, entry.gst_rate)
-        recomputed.append(
-            {
-                "line_no": entry.line_no,
-                "description_raw": entry.description_raw,
-                "description_norm": entry.description_norm,
-                "hsn_sac": entry.hsn_sac,
-                "qty": entry.qty,
-                "unit_price": entry.unit_price,
-                "gst_rate": entry.gst_rate,
-                "line_subtotal": subtotal,
-                "line_tax": tax,
-                "line_total": total,
-            }
+def _recompute_line_totals(lines: list[_LineSnapshot]) -> list[_LineTotals]:
+    totals = arithmetic.recompute_line_totals_batch(
+        (entry.qty for entry in lines),
+        (entry.unit_price for entry in lines),
+        (entry.gst_rate for entry in lines),
+    )
+    return [
+        _LineTotals(
+            line_no=entry.line_no,
+            description_raw=entry.description_raw,
+            description_norm=entry.description_norm,
+            hsn_sac=entry.hsn_sac,
+            qty=entry.qty,
+            unit_price=entry.unit_price,
+            gst_rate=entry.gst_rate,
+            line_subtotal=subtotal,
+            line_tax=tax,
+            line_total=total,
         )
-    return recomputed
+        for entry, (subtotal, tax, total) in zip(lines, totals)
+    ]
 
 
-def _aggregate_totals(lines: Iterable[dict[str, Decimal | None]]) -> tuple[Decimal, Decimal, Decimal]:
-    subtotal = Decimal(0)
-    tax = Decimal(0)
-    grand = Decimal(0)
-    for line in lines:
-        subtotal += Decimal(line.get("line_subtotal") or 0)
-        tax += Decimal(line.get("line_tax") or 0)
-        grand += Decimal(line.get("line_total") or 0)
-    return subtotal, tax, grand
+def _aggregate_totals(lines: list[_LineTotals]) -> tuple[Decimal, Decimal, Decimal]:
+    zero = Decimal(0)
+    return (
+        sum((line.line_subtotal for line in lines), zero),
+        sum((line.line_tax for line in lines), zero),
+        sum((line.line_total for line in lines), zero),
+    )
 
 
 def _build_counterfactual_contributors(
     invoice: Invoice,
-    lines: list[dict[str, Decimal | None]],
+    lines: list[_LineTotals],
+    totals_expected: tuple[Decimal, Decimal, Decimal],
     baseline: List[Contributor],
     epsilon: Decimal,
+    *,
+    changed_fields: frozenset[str],
+    outlier_epsilon: float,
+    lookback: int,
 ) -> tuple[List[Contributor], int]:
+    """Recompute only the contributors whose inputs the request touched.
+
+    Everything else is carried over from ``baseline`` so an edit that cannot move
+    a contributor neither pays for it (the market baseline is the costly one) nor
+    reports a spurious delta for it.
+    """
     by_name = {contrib.name: contrib for contrib in baseline}
+    overrides: dict[str, Contributor] = {}
+    # The mismatch note describes the edited lines even when the contributor is
+    # carried over; ``get_rates`` is cached per (code, date), so counting is cheap.
+    hsn_flag, mismatches = _hsn_stats(invoice, lines)
+
+    if changed_fields & _MARKET_FIELDS:
+        overrides["market_outlier"] = _market_contributor(
+            invoice,
+            lines,
+            outlier_epsilon=outlier_epsilon,
+            lookback=lookback,
+        )
+
+    if changed_fields & _ARITHMETIC_FIELDS:
+        stored_subtotal = Decimal(invoice.subtotal or 0)
+        stored_tax = Decimal(invoice.tax_total or 0)
+        stored_grand = Decimal(invoice.grand_total or 0)
+        arithmetic_flag = 1.0 if (
+            (totals_expected[0] - stored_subtotal).copy_abs() > epsilon
+            or (totals_expected[1] - stored_tax).copy_abs() > epsilon
+            or (totals_expected[2] - stored_grand).copy_abs() > epsilon
+        ) else 0.0
+        overrides["arithmetic"] = Contributor(
+            "arithmetic",
+            arithmetic_flag,
+            by_name.get("arithmetic", Contributor("arithmetic", 0.0, {})).details,
+        )
+
+    if changed_fields & _HSN_FIELDS:
+        overrides["hsn_rate"] = Contributor(
+            "hsn_rate",
+            hsn_flag,
+            by_name.get("hsn_rate", Contributor("hsn_rate", 0.0, {})).details,
+        )
+
+    contributors_after = [
+        overrides.get(contrib.name) or Contributor(contrib.name, contrib.raw_score, contrib.details)
+        for contrib in baseline
+    ]
+
+    return contributors_after, mismatches
+
 
+def _market_contributor(
+    invoice: Invoice,
+    lines: list[_LineTotals],
+    *,
+    outlier_epsilon: float,
+    lookback: int,
+) -> Contributor:
     currency = invoice.currency
-    lookback = int(current_app.config.get("BENCH_LOOKBACK_DAYS", 365))
     outlier_scores: list[dict[str, object]] = []
     scores: list[float] = []
+    empty_baseline = BaselineResult(median=None, mad=None, sample_count=0)
+
+    text_norms = [line.description_norm or line.description_raw or "" for line in lines]
+    baselines = benchmark_service.build_baselines(
+        text_norms,
+        currency,
+        lookback,
+        organization_id=invoice.organization_id,
+    )
 
-    for line in lines:
-        qty = Decimal(line.get("qty") or 0)
-        unit_price = Decimal(line.get("unit_price") or 0)
-        text_norm = str(line.get("description_norm") or line.get("description_raw") or "")
-        baseline_result = benchmark_service.build_baseline(
-            text_norm,
-            currency,
-            lookback,
-            organization_id=invoice.organization_id,
-        )
+    for line, text_norm in zip(lines, text_norms):
+        qty = line.qty
+        unit_price = line.unit_price
+        baseline_result = baselines.get(text_norm, empty_baseline)
         if unit_price:
-            median_value = baseline_result.median or unit_price
-            mad_value = baseline_result.mad or Decimal(str(current_app.config.get("OUTLIER_EPSILON", 0.01)))
-            denominator = max(mad_value.copy_abs(), Decimal(str(current_app.config.get("OUTLIER_EPSILON", 0.01))))
-            if denominator == 0:
-                denominator = Decimal("1")
-            robust_z = float((Decimal("0.6745") * (unit_price - median_value) / denominator))
-            score = benchmark_service.outlier_score(unit_price, median_value, mad_value, epsilon=float(current_app.config.get("OUTLIER_EPSILON", 0.01)))
+            price = float(unit_price)
+            median_value = float(baseline_result.median) if baseline_result.median else price
+            mad_value = float(baseline_result.mad) if baseline_result.mad else outlier_epsilon
+            denominator = max(abs(mad_value), outlier_epsilon) or 1.0
+            robust_z = 0.6745 * (price - median_value) / denominator
+            score = benchmark_service.outlier_score(price, median_value, mad_value, epsilon=outlier_epsilon)
             scores.append(score)
             outlier_scores.append(
                 {
-                    "line_no": line["line_no"],
-                    "unit_price": float(unit_price),
-                    "median": float(median_value) if median_value is not None else None,
-                    "mad": float(mad_value),
+                    "line_no": line.line_no,
+                    "unit_price": price,
+                    "median": median_value,
+                    "mad": mad_value,
                     "robust_z": robust_z,
                     "outlier_score": score,
                     "qty": float(qty),
@@ -272,7 +410,7 @@ def _build_counterfactual_contributors(
     avg_outlier = sum(scores) / len(scores) if scores else 0.0
     outlier_scores.sort(key=lambda item: item.get("robust_z", 0), reverse=True)
 
-    market_contrib = Contributor(
+    return Contributor(
         name="market_outlier",
         raw_score=min(1.0, max(0.0, avg_outlier)),
         details={
@@ -281,59 +419,21 @@ def _build_counterfactual_contributors(
         },
     )
 
-    totals_expected = _aggregate_totals(lines)
-    stored_subtotal = Decimal(invoice.subtotal or 0)
-    stored_tax = Decimal(invoice.tax_total or 0)
-    stored_grand = Decimal(invoice.grand_total or 0)
-    arithmetic_flag = 1.0 if (
-        (totals_expected[0] - stored_subtotal).copy_abs() > epsilon
-        or (totals_expected[1] - stored_tax).copy_abs() > epsilon
-        or (totals_expected[2] - stored_grand).copy_abs() > epsilon
-    ) else 0.0
-    arithmetic_contrib = Contributor(
-        "arithmetic",
-        arithmetic_flag,
-        by_name.get("arithmetic", Contributor("arithmetic", 0.0, {})).details,
-    )
-
-    lines_list = list(lines)
-    hsn_flag, mismatches = _hsn_stats(invoice, lines_list)
-    hsn_contrib = Contributor(
-        "hsn_rate",
-        hsn_flag,
-        by_name.get("hsn_rate", Contributor("hsn_rate", 0.0, {})).details,
-    )
-
-    contributors_after: List[Contributor] = []
-    for contrib in baseline:
-        if contrib.name == "market_outlier":
-            contributors_after.append(market_contrib)
-        elif contrib.name == "arithmetic":
-            contributors_after.append(arithmetic_contrib)
-        elif contrib.name == "hsn_rate":
-            contributors_after.append(hsn_contrib)
-        else:
-            contributors_after.append(Contributor(contrib.name, contrib.raw_score, contrib.details))
-
-    return contributors_after, mismatches
-
 
-def _hsn_stats(invoice: Invoice, lines: Iterable[dict[str, Decimal | None]]) -> tuple[float, int]:
-    lines_list = list(lines)
-    invoice_date = invoice.invoice_date
+def _hsn_stats(invoice: Invoice, lines: list[_LineTotals]) -> tuple[float, int]:
+    codes = [line.hsn_sac.strip().upper() if line.hsn_sac else None for line in lines]
+    rates = hsn_service.get_rates(codes, invoice.invoice_date)
     mismatches = 0
-    for line in lines_list:
-        code = line.get("hsn_sac")
-        rate = Decimal(line.get("gst_rate") or 0)
-        expected = hsn_service.get_rate(str(code) if code else None, invoice_date)
+    for line, code in zip(lines, codes):
+        expected = rates.get(code) if code else None
         if expected is None:
             continue
-        expected_rate = Decimal(expected.tax_rate or 0)
-        if expected_rate != rate:
+        # RateEntry.gst_rate is already a Decimal from the Numeric column.
+        if expected.gst_rate != line.gst_rate:
             mismatches += 1
     if mismatches == 0:
         return 0.0, 0
-    total_lines = len(lines_list) or 1
+    total_lines = len(lines) or 1
     return min(1.0, mismatches / total_lines), mismatches
 
 
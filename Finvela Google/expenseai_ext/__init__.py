@@ -63,6 +63,7 @@ def create_app(
     if create_db:
         with app.app_context():
             db_ext.db.create_all() 
+            db_ext.apply_schema_backfills(app)
 
     if mount_legacy:
         _mount_legacy_app(app)
@@ -0,0 +1,44 @@
+"""Streaming CSV row iteration shared by the catalog upload services."""
+from __future__ import annotations
+
+import csv
+import io
+from typing import BinaryIO, Iterable, Iterator, Sequence
+
+
+def iter_csv_rows(
+    stream: BinaryIO,
+    columns: Sequence[str],
+    *,
+    required: Iterable[str],
+) -> Iterator[tuple[str, ...]]:
+    """Yield one tuple of cell strings per data row, ordered like ``columns``.
+
+    ``stream`` is a binary UTF-8 (optionally BOM-prefixed) CSV stream. Header
+    names are matched after stripping whitespace; absent optional columns and
+    empty cells yield ``""``. Raises ``ValueError`` when a required column is
+    missing and ``UnicodeDecodeError`` when the payload is not valid UTF-8.
+    The stream is decoded incrementally and is never read into memory whole;
+    callers should pass ``FileStorage.stream`` or an open file directly.
+    """
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text_stream)
+        header = {name.strip(): index for index, name in enumerate(next(reader, []))}
+        _check_required(header, required)
+        positions = [header.get(name) for name in columns]
+        width = max((position for position in positions if position is not None), default=-1) + 1
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row.extend([""] * (width - len(row)))
+            yield tuple(row[position] if position is not None else "" for position in positions)
+    finally:
+        text_stream.detach()  # the caller owns the underlying stream
+
+
+def _check_required(header: Iterable[str], required: Iterable[str]) -> None:
+    missing = set(required) - set(header)
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
@@ -6,6 +6,7 @@ from typing import Any, Dict, Iterable, Tuple
 import math
 
 from flask import Flask, Response, current_app, g, jsonify, make_response, render_template, request
+from jinja2 import Template
 from werkzeug.exceptions import HTTPException
 
 _ERROR_TEMPLATES = {
@@ -86,13 +87,16 @@ class NotFoundError(AppError):
 
 
 def _redact_dict(data: Dict[str, Any], keys: Iterable[str]) -> Dict[str, Any]:
-    lowered = {key.lower() for key in keys}
+    return _redact_dict_inner(data, frozenset(key.lower() for key in keys))
+
+
+def _redact_dict_inner(data: Dict[str, Any], lowered: frozenset[str]) -> Dict[str, Any]:
     redacted: Dict[str, Any] = {}
     for key, value in data.items():
         if key.lower() in lowered:
             redacted[key] = "***"
         elif isinstance(value, dict):
-            redacted[key] = _redact_dict(value, lowered)
+            redacted[key] = _redact_dict_inner(value, lowered)
         else:
             redacted[key] = value
     return redacted
@@ -107,6 +111,16 @@ def init_app(app: Flask) -> None:
     app.register_error_handler(HTTPException, _handle_http_exception)
     app.register_error_handler(Exception, _handle_unexpected)
 
+    app.extensions["retry_after_header"] = _retry_after_header(app.config.get("BACKOFF_BASE_SECS", 1.5))
+
+
+def _retry_after_header(backoff: Any) -> str:
+    try:
+        retry_after = max(1, int(math.ceil(float(backoff))))
+    except (TypeError, ValueError):
+        retry_after = 1
+    return str(retry_after)
+
 
 def _handle_app_error(error: AppError):
     return _format_error(error)
@@ -136,21 +150,33 @@ def _format_error(error: AppError):
         resp = jsonify(payload)
         resp.status_code = status
     else:
-        template = _ERROR_TEMPLATES.get(status, "errors/500.html")
+        template = _error_template(_ERROR_TEMPLATES.get(status, "errors/500.html"))
         resp = make_response(render_template(template, error=payload["error"]), status)
     return _attach_request_id(resp, status)
 
 
+def _error_template(name: str) -> Template | str:
+    """Return the compiled error template, resolved once per app.
+
+    ``render_template`` accepts a ``Template`` directly, so context processors
+    still run while the loader lookup is skipped. With template auto-reload on
+    (development) the name is returned so edits are picked up.
+    """
+    if current_app.jinja_env.auto_reload:
+        return name
+    compiled = current_app.extensions.setdefault("expenseai_error_templates", {})
+    template = compiled.get(name)
+    if template is None:
+        template = current_app.jinja_env.get_template(name)
+        compiled[name] = template
+    return template
+
+
 def _attach_request_id(response: Response, status: int | None = None):
     request_id = getattr(g, "request_id", None)
     if request_id:
         response.headers["X-Request-ID"] = request_id
     status_code = status or getattr(response, "status_code", 500)
     if status_code in {429, 503, 504} and "Retry-After" not in response.headers:
-        backoff = current_app.config.get("BACKOFF_BASE_SECS", 1.5)
-        try:
-            retry_after = max(1, int(math.ceil(float(backoff))))
-        except (TypeError, ValueError):
-            retry_after = 1
-        response.headers["Retry-After"] = str(retry_after)
+        response.headers["Retry-After"] = current_app.extensions["retry_after_header"]
     return response
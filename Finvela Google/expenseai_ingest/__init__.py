@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from flask import Flask
 
-from expenseai_ingest.config import IngestSettings
+from expenseai_ingest.config import get_settings
 from expenseai_ingest.emailer import start_email_poller
 from expenseai_ingest.routes import ingest_admin_bp
 from expenseai_ingest.watcher import start_watchers
@@ -12,7 +12,7 @@ __all__ = ["init_app", "shutdown", "ingest_admin_bp"]
 
 
 def init_app(app: Flask) -> None:
-    settings = IngestSettings.from_app(app)
+    settings = get_settings(app)
     extension_state = app.extensions.setdefault("expenseai_ingest", {})
 
     watcher = start_watchers(app, settings)
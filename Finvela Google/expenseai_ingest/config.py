@@ -4,7 +4,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Iterable
 
-from flask import Flask
+from flask import Flask, current_app
 
 
 @dataclass(frozen=True)
@@ -37,8 +37,8 @@ class StorageSettings:
 @dataclass(frozen=True)
 class IngestSettings:
     watch_paths: tuple[str, ...]
-    allowed_extensions: tuple[str, ...]
-    allowed_mime_types: tuple[str, ...]
+    allowed_extensions: frozenset[str]
+    allowed_mime_types: frozenset[str]
     max_file_mb: int
     email: EmailSettings
     storage: StorageSettings
@@ -65,8 +65,8 @@ class IngestSettings:
         )
         return cls(
             watch_paths=watch_paths,
-            allowed_extensions=tuple(extensions),
-            allowed_mime_types=tuple(mime_types),
+            allowed_extensions=frozenset(extensions),
+            allowed_mime_types=frozenset(mime_types),
             max_file_mb=int(app.config.get("INGEST_MAX_FILE_MB", 20)),
             email=email,
             storage=storage,
@@ -77,4 +77,19 @@ class IngestSettings:
         return self.max_file_mb * 1024 * 1024
 
 
-__all__ = ["IngestSettings", "EmailSettings", "StorageSettings"]
+def get_settings(app: Flask | None = None) -> IngestSettings:
+    """Return the app's ingest settings, built once and cached on ``app.extensions``.
+
+    Settings are read at first use; drop ``app.extensions["expenseai_ingest"]["settings"]``
+    after changing the related config keys at runtime.
+    """
+    app = app or current_app
+    state = app.extensions.setdefault("expenseai_ingest", {})
+    settings = state.get("settings")
+    if settings is None:
+        settings = IngestSettings.from_app(app)
+        state["settings"] = settings
+    return settings
+
+
+__all__ = ["IngestSettings", "EmailSettings", "StorageSettings", "get_settings"]
@@ -7,13 +7,14 @@ from typing import Any, Mapping
 
 from celery.utils.log import get_task_logger
 from flask import current_app
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 
 from expenseai.celery_app import celery
 from expenseai_ai import parser_service
 from expenseai_ext.db import db
 from expenseai_ingest import utils
-from expenseai_ingest.config import IngestSettings
+from expenseai_ingest.config import IngestSettings, get_settings
 from expenseai_ingest.storage import StorageError, StorageResult, get_storage
 from expenseai_models.invoice import Invoice
 from expenseai_models.invoice_event import InvoiceEvent
@@ -22,7 +23,7 @@ logger = get_task_logger(__name__)
 
 
 def _settings() -> IngestSettings:
-    return IngestSettings.from_app(current_app)
+    return get_settings(current_app)
 
 
 def _normalize_metadata(metadata: Mapping[str, Any] | None) -> dict[str, Any]:
@@ -40,19 +41,60 @@ def _safe_metadata(metadata: Mapping[str, Any]) -> dict[str, Any]:
     return safe
 
 
-def _validate_payload(*, filename: str, data: bytes, mime_type: str | None, settings: IngestSettings) -> str:
+def _validate_payload(*, filename: str, head: bytes, size: int, mime_type: str | None, settings: IngestSettings) -> str:
     utils.validate_extension(filename, settings.allowed_extensions)
-    if len(data) > settings.max_bytes:
+    if size > settings.max_bytes:
         raise ValueError("File exceeds ingestion size limit")
     fallback_mime = mime_type or utils.guess_mime_from_name(filename)
-    detected_mime = utils.detect_mime(data, fallback_mime)
+    detected_mime = utils.detect_mime(head, fallback_mime)
     utils.enforce_mime(detected_mime, settings.allowed_mime_types)
     return detected_mime
 
 
-def _store(data: bytes, filename: str, mime_type: str) -> StorageResult:
-    storage = get_storage()
-    return storage.store_bytes(data=data, original_name=filename, mime_type=mime_type)
+def _store_path(file_path: Path, *, filename: str, mime_type: str | None, settings: IngestSettings) -> tuple[StorageResult, str]:
+    """Validate and store a file on disk, streaming it instead of loading it whole."""
+    detected_mime = _validate_payload(
+        filename=filename,
+        head=utils.read_head(file_path),
+        size=file_path.stat().st_size,
+        mime_type=mime_type,
+        settings=settings,
+    )
+    storage_result = get_storage().store_path(path=file_path, original_name=filename, mime_type=detected_mime)
+    return storage_result, detected_mime
+
+
+def _store_bytes(data: bytes, *, filename: str, mime_type: str | None, settings: IngestSettings) -> tuple[StorageResult, str]:
+    detected_mime = _validate_payload(
+        filename=filename,
+        head=data[: utils.MIME_SNIFF_BYTES],
+        size=len(data),
+        mime_type=mime_type,
+        settings=settings,
+    )
+    storage_result = get_storage().store_bytes(data=data, original_name=filename, mime_type=detected_mime)
+    return storage_result, detected_mime
+
+
+def _store_source(
+    *,
+    path: str | None,
+    data_b64: str | None,
+    filename: str | None,
+    mime_type: str | None,
+    missing_message: str,
+) -> tuple[StorageResult, str]:
+    """Validate and store an ingest payload given either a file path or base64 data."""
+    settings = _settings()
+    if path:
+        file_path = Path(path)
+        if not file_path.exists() or not file_path.is_file():
+            raise FileNotFoundError(path)
+        return _store_path(file_path, filename=filename or file_path.name, mime_type=mime_type, settings=settings)
+    if data_b64:
+        data = utils.decode_bytes(data_b64)
+        return _store_bytes(data, filename=filename or "ingest-upload", mime_type=mime_type, settings=settings)
+    raise ValueError(missing_message)
 
 
 def _create_invoice(storage_result: StorageResult, metadata: dict[str, Any]) -> Invoice:
@@ -86,39 +128,25 @@ def _create_invoice(storage_result: StorageResult, metadata: dict[str, Any]) ->
 
 @celery.task(name="expenseai_ingest.save_original", autoretry_for=(StorageError, OSError), retry_backoff=True, retry_kwargs={"max_retries": 5})
 def save_original(*, path: str | None = None, data_b64: str | None = None, filename: str | None = None, mime_type: str | None = None) -> dict[str, Any]:
-    settings = _settings()
-    if path:
-        file_path = Path(path)
-        if not file_path.exists() or not file_path.is_file():
-            raise FileNotFoundError(path)
-        data = file_path.read_bytes()
-        name = filename or file_path.name
-    elif data_b64:
-        data = utils.decode_bytes(data_b64)
-        name = filename or "ingest-upload"
-    else:
-        raise ValueError("Either path or data_b64 must be provided")
-    detected_mime = _validate_payload(filename=name, data=data, mime_type=mime_type, settings=settings)
-    storage_result = _store(data, name, detected_mime)
+    storage_result, _ = _store_source(
+        path=path,
+        data_b64=data_b64,
+        filename=filename,
+        mime_type=mime_type,
+        missing_message="Either path or data_b64 must be provided",
+    )
     return storage_result.to_dict()
 
 
 def _ingest_from_source(*, path: str | None, data_b64: str | None, filename: str | None, mime_type: str | None, metadata: Mapping[str, Any] | None) -> tuple[StorageResult, dict[str, Any]]:
-    settings = _settings()
     meta = _normalize_metadata(metadata)
-    if path:
-        file_path = Path(path)
-        if not file_path.exists() or not file_path.is_file():
-            raise FileNotFoundError(path)
-        data = file_path.read_bytes()
-        name = filename or file_path.name
-    elif data_b64:
-        data = utils.decode_bytes(data_b64)
-        name = filename or "ingest-upload"
-    else:
-        raise ValueError("No source payload supplied")
-    detected_mime = _validate_payload(filename=name, data=data, mime_type=mime_type, settings=settings)
-    storage_result = _store(data, name, detected_mime)
+    storage_result, detected_mime = _store_source(
+        path=path,
+        data_b64=data_b64,
+        filename=filename,
+        mime_type=mime_type,
+        missing_message="No source payload supplied",
+    )
     meta = meta | {
         "mime_type": detected_mime,
         "filesize_bytes": storage_result.filesize_bytes,
@@ -127,42 +155,34 @@ def _ingest_from_source(*, path: str | None, data_b64: str | None, filename: str
     return storage_result, meta
 
 
-@celery.task(name="expenseai_ingest.create_invoice_from_path", bind=True, autoretry_for=(StorageError, OSError), retry_backoff=True, retry_kwargs={"max_retries": 5})
-def create_invoice_from_path(self, path: str, metadata: Mapping[str, Any] | None = None) -> dict[str, Any]:
-    storage_result, meta = _ingest_from_source(path=path, data_b64=None, filename=None, mime_type=None, metadata=metadata)
-    new_invoice = True
+def _register_invoice(storage_result: StorageResult, meta: dict[str, Any]) -> dict[str, Any]:
+    # stored_filename carries a fresh uuid4 per stored object, so the INSERT is
+    # the common path; the unique-constraint catch only covers retried tasks.
     try:
-        invoice = _create_invoice(storage_result, meta)
+        invoice_id = _create_invoice(storage_result, meta).id
     except IntegrityError as exc:
         db.session.rollback()
         logger.warning("Invoice storage duplicate detected", exc_info=exc)
-        invoice = Invoice.query.filter_by(stored_filename=storage_result.stored_filename).first()
-        if not invoice:
+        invoice_id = db.session.execute(
+            select(Invoice.id).where(Invoice.stored_filename == storage_result.stored_filename)
+        ).scalar_one_or_none()
+        if invoice_id is None:
             raise
-        new_invoice = False
-    payload = {"invoice_id": invoice.id, "stored_filename": storage_result.stored_filename}
-    if new_invoice:
-        _enqueue_parse_if_needed(invoice.id, meta)
-    return payload
+        return {"invoice_id": invoice_id, "stored_filename": storage_result.stored_filename}
+    _enqueue_parse_if_needed(invoice_id, meta)
+    return {"invoice_id": invoice_id, "stored_filename": storage_result.stored_filename}
+
+
+@celery.task(name="expenseai_ingest.create_invoice_from_path", bind=True, autoretry_for=(StorageError, OSError), retry_backoff=True, retry_kwargs={"max_retries": 5})
+def create_invoice_from_path(self, path: str, metadata: Mapping[str, Any] | None = None) -> dict[str, Any]:
+    storage_result, meta = _ingest_from_source(path=path, data_b64=None, filename=None, mime_type=None, metadata=metadata)
+    return _register_invoice(storage_result, meta)
 
 
 @celery.task(name="expenseai_ingest.create_invoice_from_bytes", bind=True, autoretry_for=(StorageError,), retry_backoff=True, retry_kwargs={"max_retries": 5})
 def create_invoice_from_bytes(self, *, data_b64: str, filename: str, metadata: Mapping[str, Any] | None = None, mime_type: str | None = None) -> dict[str, Any]:
     storage_result, meta = _ingest_from_source(path=None, data_b64=data_b64, filename=filename, mime_type=mime_type, metadata=metadata)
-    new_invoice = True
-    try:
-        invoice = _create_invoice(storage_result, meta)
-    except IntegrityError as exc:
-        db.session.rollback()
-        logger.warning("Invoice storage duplicate detected", exc_info=exc)
-        invoice = Invoice.query.filter_by(stored_filename=storage_result.stored_filename).first()
-        if not invoice:
-            raise
-        new_invoice = False
-    payload = {"invoice_id": invoice.id, "stored_filename": storage_result.stored_filename}
-    if new_invoice:
-        _enqueue_parse_if_needed(invoice.id, meta)
-    return payload
+    return _register_invoice(storage_result, meta)
 
 
 def _enqueue_parse_if_needed(invoice_id: int, metadata: Mapping[str, Any]) -> None:
@@ -5,18 +5,21 @@ import base64
 import hashlib
 import mimetypes
 from pathlib import Path
-from typing import Iterable
+from typing import AbstractSet
 
 import filetype
 
+# filetype only inspects leading magic bytes, so sniffing never needs the whole file.
+MIME_SNIFF_BYTES = 4096
+
 
 def normalize_extension(filename: str) -> str:
     return Path(filename).suffix.lower().lstrip(".")
 
 
-def validate_extension(filename: str, allowed: Iterable[str]) -> None:
+def validate_extension(filename: str, allowed: AbstractSet[str]) -> None:
     ext = normalize_extension(filename)
-    if ext not in set(allowed):
+    if ext not in allowed:
         raise ValueError(f"Unsupported file extension: {ext or '<none>'}")
 
 
@@ -29,8 +32,13 @@ def detect_mime(data: bytes, fallback: str | None = None) -> str:
     return "application/octet-stream"
 
 
-def enforce_mime(mime: str, allowed: Iterable[str]) -> None:
-    if mime not in set(allowed):
+def read_head(path: Path, size: int = MIME_SNIFF_BYTES) -> bytes:
+    with path.open("rb") as handle:
+        return handle.read(size)
+
+
+def enforce_mime(mime: str, allowed: AbstractSet[str]) -> None:
+    if mime not in allowed:
         raise ValueError(f"Unsupported MIME type: {mime}")
 
 
@@ -40,9 +48,18 @@ def guess_mime_from_name(filename: str) -> str | None:
 
 
 def compute_sha256(data: bytes) -> str:
-    digest = hashlib.sha256()
-    digest.update(data)
-    return digest.hexdigest()
+    return hashlib.sha256(data, usedforsecurity=False).hexdigest()
+
+
+def compute_sha256_path(path: Path) -> str:
+    """Hash a file on disk without materialising it as one ``bytes`` object."""
+    with path.open("rb") as handle:
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(handle, "sha256").hexdigest()
+        digest = hashlib.sha256(usedforsecurity=False)
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+        return digest.hexdigest()
 
 
 def encode_bytes(data: bytes) -> str:
@@ -110,8 +110,7 @@ class WatcherManager:
     def _ingest_path(self, path: Path, *, root: Optional[Path]) -> None:
         if not self._wait_for_stable_size(path):
             raise RuntimeError("File size never stabilized before timeout")
-        with path.open("rb") as fh:
-            head = fh.read(4096)
+        head = utils.read_head(path)
         utils.validate_extension(path.name, self.settings.allowed_extensions)
         mime_guess = utils.guess_mime_from_name(path.name)
         mime = utils.detect_mime(head, mime_guess)
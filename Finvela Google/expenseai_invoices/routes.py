@@ -37,7 +37,7 @@ from expenseai_ext.db import db
 from expenseai_ext.idempotency import idempotent
 from expenseai_ext.security import limiter, user_or_ip_rate_limit
 from expenseai_invoices import invoices_bp
-from expenseai_invoices.duplicate_detection import run_manual_duplicate_checks
+from expenseai_invoices.duplicate_detection import refresh_duplicate_snapshot, run_manual_duplicate_checks
 from expenseai_invoices.forms import InvoiceActionForm, InvoiceUploadForm
 from expenseai_models import AuditLog
 from expenseai_models.invoice import INVOICE_STATUSES, Invoice
@@ -841,6 +841,7 @@ def verify_gst(invoice_id: int, subject: str) -> Response:
     gstin = gst_provider.normalize_gstin(gst_value)
     if normalized == "vendor" and gstin != (invoice.vendor_gst or ""):
         invoice.vendor_gst = gstin
+        refresh_duplicate_snapshot(invoice)
     elif normalized == "company" and gstin != (invoice.company_gst or ""):
         invoice.company_gst = gstin
 
@@ -28,6 +28,8 @@ class LineItem(db.Model):
     line_no: Mapped[int] = mapped_column(Integer, nullable=False)
     description_raw: Mapped[str] = mapped_column(Text, nullable=False)
     description_norm: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # normalize_for_embedding() output, stored at parse time for benchmark lookups.
+    description_norm_canonical: Mapped[str | None] = mapped_column(Text, nullable=True)
     hsn_sac: Mapped[str | None] = mapped_column(String(64), nullable=True)
     qty: Mapped[Decimal | None] = mapped_column(Numeric(18, 6), nullable=True)
     unit_price: Mapped[Decimal | None] = mapped_column(Numeric(18, 6), nullable=True)
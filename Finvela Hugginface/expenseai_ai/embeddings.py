@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import hashlib
 import math
+from functools import lru_cache
 
 from flask import current_app
 
@@ -10,7 +11,13 @@ from expenseai_ai import model_client, norm
 from expenseai_ext.db import db
 from expenseai_models.item_embedding import ItemEmbedding
 
+_NORMALIZE_CACHE_SIZE = 65_536
+_EMBEDDING_ID_CACHE_SIZE = 65_536
+# hash_key -> ItemEmbedding.id for rows already seen committed in the database.
+_embedding_ids: dict[str, int] = {}
 
+
+@lru_cache(maxsize=_NORMALIZE_CACHE_SIZE)
 def normalize_for_embedding(text: str) -> str:
     """Normalize text prior to embedding, ensuring deterministic hashing."""
     normalized = norm.normalize_description(text)
@@ -66,8 +73,16 @@ def get_or_create_item_embedding(text: str) -> ItemEmbedding:
         raise ValueError("Cannot embed empty text")
 
     key = text_hash(normalized)
+    cached_id = _embedding_ids.get(key)
+    if cached_id is not None:
+        record = db.session.get(ItemEmbedding, cached_id)
+        if record is not None:
+            return record
+        _embedding_ids.pop(key, None)
+
     record = ItemEmbedding.query.filter_by(hash_key=key).first()
     if record:
+        _remember_embedding_id(key, record.id)
         return record
 
     vector = embed_text(normalized)
@@ -77,6 +92,13 @@ def get_or_create_item_embedding(text: str) -> ItemEmbedding:
     return record
 
 
+def _remember_embedding_id(key: str, record_id: int) -> None:
+    """Cache the primary key of a persisted embedding, resetting when full."""
+    if len(_embedding_ids) >= _EMBEDDING_ID_CACHE_SIZE:
+        _embedding_ids.clear()
+    _embedding_ids[key] = record_id
+
+
 def _fallback_embedding(text: str, dimensions: int) -> list[float]:
     """Return a deterministic embedding using locality-sensitive hashing as fallback."""
     dims = max(16, dimensions)
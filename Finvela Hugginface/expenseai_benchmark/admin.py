@@ -1,20 +1,20 @@
 """Admin routes for managing external benchmark CSV uploads."""
 from __future__ import annotations
 
-import csv
-import io
+import hashlib
+import shutil
+import time
+import uuid
 from datetime import date, datetime
-from decimal import Decimal, InvalidOperation
+from pathlib import Path
 
-from flask import Blueprint, Response, current_app, flash, redirect, render_template, url_for
-from flask_login import login_required
+from flask import Blueprint, Response, current_app, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
 
-from expenseai_ai.embeddings import normalize_for_embedding
 from expenseai_benchmark.forms import BenchmarkUploadForm
 from expenseai_ext import auth as auth_ext
 from expenseai_ext.db import db
 from expenseai_ext.security import limiter, user_or_ip_rate_limit
-from expenseai_models import AuditLog
 from expenseai_models.external_benchmark import ExternalBenchmark
 
 benchmark_admin_bp = Blueprint(
@@ -24,6 +24,11 @@ benchmark_admin_bp = Blueprint(
     url_prefix="/admin/benchmarks",
 )
 
+_STATS_TTL = 30.0
+
+_sample_cache: tuple[date, bytes, str] | None = None
+_stats_cache: tuple[float, dict[str, object]] | None = None
+
 
 @benchmark_admin_bp.route("/", methods=["GET", "POST"])
 @login_required
@@ -32,137 +37,100 @@ benchmark_admin_bp = Blueprint(
 def upload_benchmarks():
     """Upload external benchmark CSVs with validation."""
     form = BenchmarkUploadForm()
-    stats = _stats()
     if form.validate_on_submit():
         storage = form.file.data
         try:
-            storage.stream.seek(0)
-            payload = storage.stream.read()
-            if isinstance(payload, str):
-                text = payload
+            staged = _stage_upload(storage.stream)
+        except OSError:
+            current_app.logger.exception("Failed to stage benchmark upload")
+            flash("Could not store the uploaded file. Please try again.", "danger")
+        else:
+            from expenseai_benchmark.tasks import ingest_benchmarks_task  # local import to avoid circular
+
+            try:
+                job = ingest_benchmarks_task.delay(str(staged), current_user.id)
+            except Exception:  # broker unreachable; the worker will never see the staged file
+                staged.unlink(missing_ok=True)
+                current_app.logger.exception("Failed to queue benchmark ingest")
+                flash("Could not queue the upload for processing. Please try again later.", "danger")
             else:
-                text = payload.decode("utf-8-sig")
-            inserted, updated = _ingest_csv(io.StringIO(text))
-            db.session.commit()
-            AuditLog.log(
-                action="benchmarks_upload",
-                entity="external_benchmark",
-                entity_id=None,
-                data={"inserted": inserted, "updated": updated},
-            )
-            flash(f"Benchmark catalog updated. Inserted {inserted}, updated {updated}.", "success")
-            return redirect(url_for("expenseai_benchmark_admin.upload_benchmarks"))
-        except UnicodeDecodeError:
-            db.session.rollback()
-            flash("Could not decode file. Ensure it is UTF-8 encoded.", "danger")
-        except ValueError as exc:
-            db.session.rollback()
-            flash(str(exc), "danger")
-        except Exception as exc:  # pragma: no cover - defensive logging only
-            db.session.rollback()
-            current_app.logger.exception("Benchmark upload failed")
-            flash(f"Unexpected error: {exc}", "danger")
+                flash("Benchmark upload queued for processing.", "info")
+                return redirect(url_for("expenseai_benchmark_admin.upload_benchmarks", job_id=job.id))
     elif form.errors:
         flash(next(iter(form.errors.values()))[0], "warning")
 
-    stats = _stats()  # refresh after possible changes
-    return render_template("benchmark_admin/upload.html", form=form, stats=stats)
+    job_id = request.args.get("job_id")
+    job = _job_status(job_id) if job_id else None
+    # A finished ingest ran in a worker process, so refresh rather than wait out the TTL.
+    stats = _stats(refresh=bool(job and job.get("status") == "ok"))
+    return render_template("benchmark_admin/upload.html", form=form, stats=stats, job=job)
 
 
-@benchmark_admin_bp.route("/download-sample", methods=["GET"])
+@benchmark_admin_bp.route("/jobs/<job_id>", methods=["GET"])
 @login_required
 @auth_ext.roles_required("admin")
-def download_sample() -> Response:
-    """Provide a sample CSV illustrating expected columns."""
-    today = datetime.utcnow().date().isoformat()
-    sample = (
-        "text_norm,currency,median_price,mad,n,source,effective_from,effective_to\n"
-        f"laptop sleeve,inr,999.0,120.0,7,internal,{today},\n"
-    )
-    response = current_app.response_class(sample, mimetype="text/csv")
-    response.headers["Content-Disposition"] = "attachment; filename=external_benchmark_sample.csv"
-    return response
-
-
-def _ingest_csv(handle: io.StringIO) -> tuple[int, int]:
-    reader = csv.DictReader(handle)
-    required = {
-        "text_norm",
-        "currency",
-        "median_price",
-        "mad",
-        "n",
-        "source",
-        "effective_from",
-        "effective_to",
-    }
-    if not required.issubset(set(reader.fieldnames or [])):
-        missing = required - set(reader.fieldnames or [])
-        raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
-
-    inserted = 0
-    updated = 0
-    for row in reader:
-        text_norm_raw = (row.get("text_norm") or "").strip()
-        normalized = normalize_for_embedding(text_norm_raw)
-        if not normalized:
-            current_app.logger.info("Skipping benchmark row without usable description", extra={"row": row})
-            continue
-        currency = (row.get("currency") or "").strip().upper() or None
-        try:
-            median_price = Decimal(row.get("median_price") or "0") if row.get("median_price") else None
-            mad = Decimal(row.get("mad") or "0") if row.get("mad") else None
-        except (InvalidOperation, ValueError) as exc:
-            raise ValueError(f"Invalid numeric value for '{row.get('text_norm', '')}': {exc}") from exc
-        try:
-            sample_size = int(row.get("n") or 0)
-        except ValueError as exc:
-            raise ValueError(f"Invalid sample size for '{row.get('text_norm', '')}': {exc}") from exc
-        source = (row.get("source") or "").strip() or None
-        eff_from = _parse_date(row.get("effective_from"))
-        eff_to = _parse_date(row.get("effective_to"))
-
-        record = (
-            ExternalBenchmark.query.filter_by(
-                text_norm=normalized,
-                currency=currency,
-                source=source,
-                effective_from=eff_from,
-            )
-            .limit(1)
-            .first()
-        )
-        payload = {
-            "text_norm": normalized,
-            "currency": currency,
-            "median_price": median_price,
-            "mad": mad,
-            "n": sample_size,
-            "source": source,
-            "effective_from": eff_from,
-            "effective_to": eff_to,
-        }
-        if record:
-            for key, value in payload.items():
-                setattr(record, key, value)
-            record.updated_at = datetime.utcnow()
-            updated += 1
-        else:
-            db.session.add(ExternalBenchmark(**payload))
-            inserted += 1
-    return inserted, updated
+def job_status(job_id: str) -> Response:
+    """Report the state of a queued benchmark ingest for polling clients."""
+    return jsonify(_job_status(job_id))
+
+
+def _stage_upload(stream) -> Path:
+    """Copy the upload stream to the instance folder for the worker to read.
 
+    The worker opens the staged path directly, so web and worker processes must
+    share ``instance_path`` (same host or a common volume).
+    """
+    folder = Path(current_app.instance_path) / "benchmark_uploads"
+    folder.mkdir(parents=True, exist_ok=True)
+    target = folder / f"{uuid.uuid4().hex}.csv"
+    stream.seek(0)
+    with target.open("wb") as handle:
+        shutil.copyfileobj(stream, handle)
+    return target
 
-def _parse_date(value: str | None) -> date | None:
-    if not value:
-        return None
-    try:
-        return datetime.fromisoformat(value.strip()).date()
-    except ValueError:
-        raise ValueError(f"Invalid date format: {value}. Expected YYYY-MM-DD.") from None
 
+def _job_status(job_id: str) -> dict[str, object]:
+    from expenseai_benchmark.tasks import ingest_benchmarks_task  # local import to avoid circular
 
-def _stats() -> dict[str, object]:
+    result = ingest_benchmarks_task.AsyncResult(job_id)
+    payload: dict[str, object] = {"job_id": job_id, "state": result.state}
+    if result.successful():
+        payload.update(result.result or {})
+    elif result.failed():
+        payload.update({"status": "error", "message": "Benchmark ingest failed unexpectedly."})
+    return payload
+
+
+@benchmark_admin_bp.route("/download-sample", methods=["GET"])
+@login_required
+@auth_ext.roles_required("admin")
+def download_sample() -> Response:
+    """Provide a sample CSV illustrating expected columns."""
+    body, etag = _sample_csv(datetime.utcnow().date())
+    response = current_app.response_class(body, mimetype="text/csv")
+    response.headers["Content-Disposition"] = "attachment; filename=external_benchmark_sample.csv"
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def _sample_csv(today: date) -> tuple[bytes, str]:
+    """Return the sample CSV body and its ETag, rebuilt once per day."""
+    global _sample_cache
+    if _sample_cache is None or _sample_cache[0] != today:
+        body = (
+            "text_norm,currency,median_price,mad,n,source,effective_from,effective_to\n"
+            f"laptop sleeve,inr,999.0,120.0,7,internal,{today.isoformat()},\n"
+        ).encode("utf-8")
+        _sample_cache = (today, body, hashlib.sha1(body).hexdigest())
+    return _sample_cache[1], _sample_cache[2]
+
+
+def _stats(*, refresh: bool = False) -> dict[str, object]:
+    """Return catalog size and freshness, cached for ``_STATS_TTL`` seconds."""
+    global _stats_cache
+    now = time.monotonic()
+    if not refresh and _stats_cache is not None and now - _stats_cache[0] < _STATS_TTL:
+        return _stats_cache[1]
     total = ExternalBenchmark.query.count()
     latest = (
         db.session.query(ExternalBenchmark.updated_at)
@@ -170,7 +138,9 @@ def _stats() -> dict[str, object]:
         .limit(1)
         .scalar()
     )
-    return {
+    stats = {
         "count": total,
         "last_updated": latest.isoformat() + "Z" if latest else None,
     }
+    _stats_cache = (now, stats)
+    return stats
@@ -2,20 +2,45 @@
 from __future__ import annotations
 
 import math
+import time
+from collections import defaultdict
 from datetime import date, datetime, timedelta
 from decimal import Decimal
-from statistics import median
-from typing import List
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+import numpy as np
 from flask import current_app
-from sqlalchemy import and_
+from sqlalchemy import Float, and_, cast, func, select
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - optional dependency
+    njit = None  # type: ignore[assignment]
 
 from expenseai_ai.embeddings import get_or_create_item_embedding, normalize_for_embedding
 from expenseai_benchmark.models import BaselineResult
-from expenseai_ext.db import db
+from expenseai_ext.db import db, dialect_name
 from expenseai_models.external_benchmark import ExternalBenchmark
 from expenseai_models.invoice import Invoice
 from expenseai_models.item_price_history import ItemPriceHistory
+from expenseai_models.line_item import LineItem
+
+# Newest external rows considered per item when looking for an active benchmark.
+_EXTERNAL_CANDIDATES = 5
+# Scales MAD to a standard-deviation equivalent for normally distributed prices.
+_MAD_SCALE = 0.6745
+# Rows per server-side cursor fetch when streaming price history.
+_PRICE_FETCH_SIZE = 2048
+
+# Seconds before the external text_norm set is reloaded; other processes only
+# see catalog uploads once their copy expires.
+_EXTERNAL_NORMS_TTL = 300.0
+
+ExternalCache = Dict[Tuple[str, Optional[str]], List[ExternalBenchmark]]
+# (median, MAD, sample count) of an item's historical unit prices.
+PriceStats = Tuple[float, float, int]
+
+_external_norms: tuple[float, frozenset[str]] | None = None
 
 
 def ingest_invoice_line_items(invoice_id: int) -> None:
@@ -33,10 +58,21 @@ def ingest_invoice_line_items(invoice_id: int) -> None:
         )
         return
 
-    invoice_currency = invoice.currency
     invoice_date = invoice.invoice_date or datetime.utcnow().date()
+    existing = {
+        tuple(row)
+        for row in ItemPriceHistory.query.with_entities(
+            ItemPriceHistory.text_norm,
+            ItemPriceHistory.unit_price,
+            ItemPriceHistory.qty,
+        ).filter(
+            ItemPriceHistory.invoice_id == invoice.id,
+            ItemPriceHistory.organization_id == org_id,
+        )
+    }
+    mappings: list[dict[str, object]] = []
     for item in invoice.line_items:
-        normalized = normalize_for_embedding(item.description_norm or item.description_raw or "")
+        normalized = _line_text_norm(item)
         if not normalized:
             continue
         try:
@@ -49,35 +85,34 @@ def ingest_invoice_line_items(invoice_id: int) -> None:
             continue
         if item.unit_price is None:
             continue
-        existing = (
-            ItemPriceHistory.query.filter(
-                and_(
-                    ItemPriceHistory.invoice_id == invoice.id,
-                    ItemPriceHistory.organization_id == org_id,
-                    ItemPriceHistory.text_norm == normalized,
-                    ItemPriceHistory.unit_price == item.unit_price,
-                    ItemPriceHistory.qty == item.qty,
-                )
-            )
-            .limit(1)
-            .first()
-        )
-        if existing:
+        key = (normalized, item.unit_price, item.qty)
+        if key in existing:
             continue
-        record = ItemPriceHistory(
-            text_norm=normalized,
-            vendor_gst=invoice.vendor_gst,
-            currency=invoice_currency,
-            unit_price=item.unit_price,
-            qty=item.qty,
-            invoice_date=invoice_date,
-            invoice_id=invoice.id,
-            organization_id=org_id,
+        existing.add(key)
+        mappings.append(
+            {
+                "text_norm": normalized,
+                "vendor_gst": invoice.vendor_gst,
+                "currency": invoice.currency,
+                "unit_price": item.unit_price,
+                "qty": item.qty,
+                "invoice_date": invoice_date,
+                "invoice_id": invoice.id,
+                "organization_id": org_id,
+            }
         )
-        db.session.add(record)
+    if mappings:
+        db.session.bulk_insert_mappings(ItemPriceHistory, mappings)
     db.session.flush()
 
 
+def _line_text_norm(item: LineItem) -> str:
+    """Return the stored canonical description, normalizing legacy rows on the fly."""
+    if item.description_norm_canonical:
+        return item.description_norm_canonical
+    return normalize_for_embedding(item.description_norm or item.description_raw or "")
+
+
 def build_baseline(
     text_norm: str,
     currency: str | None,
@@ -85,43 +120,166 @@ def build_baseline(
     *,
     as_of: date | None = None,
     organization_id: int | None = None,
+    external_cache: ExternalCache | None = None,
 ) -> BaselineResult:
     """Compute median and MAD for the requested item within the lookback window."""
     if not text_norm:
         return BaselineResult(median=None, mad=None, sample_count=0)
+    baselines = build_baselines(
+        [text_norm],
+        currency,
+        lookback_days,
+        as_of=as_of,
+        organization_id=organization_id,
+        external_cache=external_cache,
+    )
+    return baselines[text_norm]
+
+
+def build_baselines(
+    text_norms: Iterable[str],
+    currency: str | None,
+    lookback_days: int,
+    *,
+    as_of: date | None = None,
+    organization_id: int | None = None,
+    external_cache: ExternalCache | None = None,
+) -> dict[str, BaselineResult]:
+    """Compute baselines for several items with one price and one external query.
+
+    Callers scoring many lines in one request can pass the same
+    ``external_cache`` dict to every call so repeated descriptions reuse the
+    external benchmark candidates instead of querying them again.
+    """
+    norms = {text_norm for text_norm in text_norms if text_norm}
+    if not norms:
+        return {}
 
     as_of = as_of or datetime.utcnow().date()
     window_start = as_of - timedelta(days=lookback_days)
-    query = ItemPriceHistory.query.filter(ItemPriceHistory.text_norm == text_norm)
+    filters = [
+        ItemPriceHistory.text_norm.in_(norms),
+        ItemPriceHistory.unit_price.isnot(None),
+        (ItemPriceHistory.invoice_date.is_(None))
+        | and_(ItemPriceHistory.invoice_date >= window_start, ItemPriceHistory.invoice_date <= as_of),
+    ]
     if organization_id is not None:
-        query = query.filter(ItemPriceHistory.organization_id == organization_id)
+        filters.append(ItemPriceHistory.organization_id == organization_id)
     if currency:
-        query = query.filter(ItemPriceHistory.currency == currency)
-    query = query.filter(
-        (ItemPriceHistory.invoice_date.is_(None))
-        | and_(ItemPriceHistory.invoice_date >= window_start, ItemPriceHistory.invoice_date <= as_of)
+        filters.append(ItemPriceHistory.currency == currency)
+    if dialect_name() == "postgresql":
+        price_stats = _grouped_price_stats(filters)
+    else:
+        price_stats = _local_price_stats(filters)
+
+    external_by_norm = _external_candidates(norms, currency, {} if external_cache is None else external_cache)
+
+    return {
+        text_norm: _baseline_from_stats(price_stats.get(text_norm), external_by_norm[text_norm], as_of)
+        for text_norm in norms
+    }
+
+
+def _grouped_price_stats(filters: list) -> dict[str, PriceStats]:
+    """Compute median, MAD and count per item in the database with percentile_cont."""
+    price = cast(ItemPriceHistory.unit_price, Float)
+    medians = (
+        select(
+            ItemPriceHistory.text_norm.label("text_norm"),
+            func.percentile_cont(0.5).within_group(price).label("median"),
+            func.count().label("n"),
+        )
+        .where(*filters)
+        .group_by(ItemPriceHistory.text_norm)
+        .subquery()
+    )
+    stmt = (
+        select(
+            medians.c.text_norm,
+            medians.c.median,
+            func.percentile_cont(0.5).within_group(func.abs(price - medians.c.median)),
+            medians.c.n,
+        )
+        .join_from(ItemPriceHistory, medians, ItemPriceHistory.text_norm == medians.c.text_norm)
+        .where(*filters)
+        .group_by(medians.c.text_norm, medians.c.median, medians.c.n)
     )
+    return {
+        text_norm: (float(median), float(mad), int(count))
+        for text_norm, median, mad, count in db.session.execute(stmt)
+    }
+
+
+def _local_price_stats(filters: list) -> dict[str, PriceStats]:
+    """Stream prices per item and compute median and MAD with numpy."""
+    query = ItemPriceHistory.query.with_entities(ItemPriceHistory.text_norm, ItemPriceHistory.unit_price).filter(*filters)
+    prices_by_norm: dict[str, list[float]] = defaultdict(list)
+    rows = query.execution_options(stream_results=True).yield_per(_PRICE_FETCH_SIZE)
+    for text_norm, unit_price in rows:
+        prices_by_norm[text_norm].append(float(unit_price))
+    stats: dict[str, PriceStats] = {}
+    for text_norm, prices in prices_by_norm.items():
+        med, mad = _median_and_mad(np.asarray(prices, dtype=np.float64))
+        stats[text_norm] = (med, mad, len(prices))
+    return stats
+
+
+def _external_candidates(
+    norms: set[str],
+    currency: str | None,
+    cache: ExternalCache,
+) -> dict[str, list[ExternalBenchmark]]:
+    """Return the newest external rows per item, querying only uncached items."""
+    missing = {text_norm for text_norm in norms if (text_norm, currency) not in cache}
+    if missing:
+        known = _known_external_norms()
+        for text_norm in missing - known:
+            cache[(text_norm, currency)] = []
+        missing &= known
+    if missing:
+        fetched: dict[str, list[ExternalBenchmark]] = {text_norm: [] for text_norm in missing}
+        external_query = (
+            ExternalBenchmark.query.filter(ExternalBenchmark.text_norm.in_(missing))
+            .filter((ExternalBenchmark.currency == currency) | (ExternalBenchmark.currency.is_(None)))
+            .order_by(ExternalBenchmark.text_norm, ExternalBenchmark.effective_from.desc().nullslast())
+        )
+        for record in external_query:
+            candidates = fetched[record.text_norm]
+            if len(candidates) < _EXTERNAL_CANDIDATES:
+                candidates.append(record)
+        for text_norm, candidates in fetched.items():
+            cache[(text_norm, currency)] = candidates
+    return {text_norm: cache[(text_norm, currency)] for text_norm in norms}
+
+
+def _known_external_norms() -> frozenset[str]:
+    """Return every text_norm with an external benchmark, reloaded after a TTL."""
+    global _external_norms
+    now = time.monotonic()
+    if _external_norms is None or now - _external_norms[0] > _EXTERNAL_NORMS_TTL:
+        rows = db.session.query(ExternalBenchmark.text_norm).distinct()
+        _external_norms = (now, frozenset(text_norm for (text_norm,) in rows))
+    return _external_norms[1]
 
-    prices: List[Decimal] = []
-    for entry in query.all():
-        if entry.unit_price is not None:
-            prices.append(Decimal(entry.unit_price))
-    if not prices:
+
+def invalidate_external_norms() -> None:
+    """Drop the cached external text_norm set after the catalog changes."""
+    global _external_norms
+    _external_norms = None
+
+
+def _baseline_from_stats(
+    stats: PriceStats | None,
+    external: Sequence[ExternalBenchmark],
+    as_of: date,
+) -> BaselineResult:
+    """Combine historical price statistics with the newest active external benchmark."""
+    if stats is None:
         baseline = BaselineResult(median=None, mad=None, sample_count=0)
     else:
-        prices.sort()
-        med = Decimal(median(prices))
-        abs_devs = [abs(p - med) for p in prices]
-        mad = Decimal(median(abs_devs)) if abs_devs else Decimal(0)
-        baseline = BaselineResult(median=med, mad=mad, sample_count=len(prices))
-
-    external = (
-        ExternalBenchmark.query.filter(ExternalBenchmark.text_norm == text_norm)
-        .filter((ExternalBenchmark.currency == currency) | (ExternalBenchmark.currency.is_(None)))
-        .order_by(ExternalBenchmark.effective_from.desc().nullslast())
-        .limit(5)
-        .all()
-    )
+        med, mad, count = stats
+        baseline = BaselineResult(median=_to_decimal(med), mad=_to_decimal(mad), sample_count=count)
+
     active_external = next((record for record in external if record.is_active(as_of)), None)
     if active_external and active_external.median_price is not None:
         baseline.used_external = True
@@ -145,19 +303,55 @@ def build_baseline(
     return baseline
 
 
-def outlier_score(price: Decimal, median_value: Decimal, mad_value: Decimal, *, epsilon: float) -> float:
+def _median_and_mad(prices: np.ndarray) -> tuple[float, float]:
+    """Return the median and median absolute deviation of a non-empty price array."""
+    # np.median selects with np.partition, so neither pass needs a full sort.
+    med = float(np.median(prices))
+    mad = float(np.median(np.abs(prices - med)))
+    return med, mad
+
+
+def _to_decimal(value: float) -> Decimal:
+    """Convert a float statistic back to Decimal using its shortest repr."""
+    return Decimal(repr(value))
+
+
+def robust_z(price: float, median_value: float, mad_value: float | None, *, epsilon: float) -> float:
+    """Return the MAD-scaled robust z-score of ``price`` against the baseline."""
+    denominator = max(abs(mad_value or 0.0), epsilon)
+    return _MAD_SCALE * (price - median_value) / denominator
+
+
+def outlier_score(price: float, median_value: float | None, mad_value: float | None, *, epsilon: float) -> float:
     """Return logistic-scaled robust z-score as risk contribution."""
-    if mad_value is None:
-        mad_value = Decimal(0)
     if median_value is None:
         return 0.0
-    denominator = max(abs(mad_value), Decimal(str(epsilon)))
-    rz = float((Decimal("0.6745") * (price - median_value) / denominator))
+    return _logistic(robust_z(price, median_value, mad_value, epsilon=epsilon))
+
+
+def _logistic(rz: float) -> float:
     exponent = -(abs(rz) - 2.0)
     logistic = 1 / (1 + math.exp(exponent))
     return max(0.0, min(logistic, 1.0))
 
 
+def _score_kernel(
+    prices: np.ndarray,
+    medians: np.ndarray,
+    mads: np.ndarray,
+    epsilon: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorised robust_z and outlier_score over every scorable line."""
+    denominators = np.maximum(np.abs(mads), epsilon)
+    rz = _MAD_SCALE * (prices - medians) / denominators
+    scores = 1.0 / (1.0 + np.exp(-(np.abs(rz) - 2.0)))
+    return rz, np.clip(scores, 0.0, 1.0)
+
+
+if njit is not None:
+    _score_kernel = njit(cache=True)(_score_kernel)
+
+
 def benchmark_invoice(invoice_id: int) -> dict[str, object]:
     """Compute per-line benchmarking metrics and aggregate score for the invoice."""
     invoice = db.session.get(Invoice, invoice_id)
@@ -169,34 +363,36 @@ def benchmark_invoice(invoice_id: int) -> dict[str, object]:
     currency = invoice.currency
     as_of = invoice.invoice_date or datetime.utcnow().date()
 
-    per_line: list[dict[str, object]] = []
-    scores: list[float] = []
+    line_items = list(invoice.line_items)
+    normalized_by_line = [_line_text_norm(item) for item in line_items]
+    baselines = build_baselines(
+        normalized_by_line,
+        currency,
+        lookback,
+        as_of=as_of,
+        organization_id=invoice.organization_id,
+    )
 
-    for item in invoice.line_items:
-        normalized = normalize_for_embedding(item.description_norm or item.description_raw or "")
-        baseline = build_baseline(
-            normalized,
-            currency,
-            lookback,
-            as_of=as_of,
-            organization_id=invoice.organization_id,
-        )
-        unit_price = Decimal(item.unit_price) if item.unit_price is not None else None
-        mad = baseline.mad or Decimal(0)
-        median_value = baseline.median or (unit_price if unit_price is not None else None)
-        rz = 0.0
-        score = 0.0
+    per_line: list[dict[str, object]] = []
+    scored: list[int] = []
+    prices: list[float] = []
+    medians: list[float] = []
+    mads: list[float] = []
+    for item, normalized in zip(line_items, normalized_by_line):
+        baseline = baselines.get(normalized) or BaselineResult(median=None, mad=None, sample_count=0)
+        unit_price = float(item.unit_price) if item.unit_price is not None else None
+        median_value = float(baseline.median) if baseline.median else unit_price
         if unit_price is not None and median_value is not None:
-            denominator = max(abs(mad), Decimal(str(epsilon)))
-            rz = float((Decimal("0.6745") * (unit_price - median_value) / denominator))
-            score = outlier_score(unit_price, median_value, mad, epsilon=epsilon)
-            scores.append(score)
+            scored.append(len(per_line))
+            prices.append(unit_price)
+            medians.append(median_value)
+            mads.append(float(baseline.mad) if baseline.mad is not None else 0.0)
         per_line.append(
             {
                 "line_no": item.line_no,
                 "description": item.description_raw,
                 "text_norm": normalized,
-                "unit_price": float(unit_price) if unit_price is not None else None,
+                "unit_price": unit_price,
                 "qty": float(item.qty) if item.qty is not None else None,
                 "currency": currency,
                 "median": float(baseline.median) if baseline.median is not None else None,
@@ -204,12 +400,23 @@ def benchmark_invoice(invoice_id: int) -> dict[str, object]:
                 "sample_count": baseline.sample_count,
                 "used_external": baseline.used_external,
                 "external_source": baseline.external_source,
-                "robust_z": rz,
-                "outlier_score": score,
+                "robust_z": 0.0,
+                "outlier_score": 0.0,
             }
         )
 
-    avg_score = sum(scores) / len(scores) if scores else 0.0
+    avg_score = 0.0
+    if scored:
+        rz_values, scores = _score_kernel(
+            np.asarray(prices, dtype=np.float64),
+            np.asarray(medians, dtype=np.float64),
+            np.asarray(mads, dtype=np.float64),
+            epsilon,
+        )
+        for index, rz, score in zip(scored, rz_values.tolist(), scores.tolist()):
+            per_line[index]["robust_z"] = rz
+            per_line[index]["outlier_score"] = score
+        avg_score = float(scores.mean())
     return {
         "invoice_id": invoice.id,
         "avg_outlier_score": avg_score,
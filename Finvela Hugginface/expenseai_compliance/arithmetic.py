@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 from decimal import ROUND_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, Decimal, getcontext
+from functools import lru_cache
 from typing import Dict, Iterable, List, Tuple
 
 from flask import current_app
@@ -12,48 +13,71 @@ ROUNDING_MODES = {
     "ROUND_DOWN": ROUND_DOWN,
 }
 
+_ZERO = Decimal(0)
+_HUNDRED = Decimal(100)
 
-def _quantize(value: Decimal, places: int, rounding) -> Decimal:
-    quantizer = Decimal("1" if places == 0 else f"1.{'0' * places}")
-    return value.quantize(quantizer, rounding=rounding)
 
+@lru_cache(maxsize=8)
+def _quantizer(places: int) -> Decimal:
+    return Decimal("1" if places == 0 else f"1.{'0' * places}")
 
-def _get_rounding() -> Tuple[int, str]:
+
+def _get_rounding() -> Tuple[Decimal, str]:
+    """Return the quantizer and rounding mode configured for the current app."""
     places = current_app.config.get("ARITH_DECIMAL_PLACES", 2)
     mode_key = current_app.config.get("ARITH_ROUNDING_MODE", "ROUND_HALF_UP")
     rounding = ROUNDING_MODES.get(mode_key, ROUND_HALF_UP)
-    return places, rounding
+    return _quantizer(places), rounding
 
 
-def recompute_line_totals(qty, unit_price, gst_rate) -> Tuple[Decimal, Decimal, Decimal]:
-    """Recompute line-level totals using configured rounding policies."""
-    places, rounding = _get_rounding()
+def _line_totals(qty, unit_price, gst_rate, quantizer: Decimal, rounding) -> Tuple[Decimal, Decimal, Decimal]:
     quantity = Decimal(qty or 0)
     price = Decimal(unit_price or 0)
-    rate = Decimal(gst_rate or 0) / Decimal(100)
+    rate = Decimal(gst_rate or 0) / _HUNDRED
 
-    subtotal = _quantize(quantity * price, places, rounding)
-    tax = _quantize(subtotal * rate, places, rounding)
-    total = _quantize(subtotal + tax, places, rounding)
+    subtotal = (quantity * price).quantize(quantizer, rounding=rounding)
+    tax = (subtotal * rate).quantize(quantizer, rounding=rounding)
+    total = (subtotal + tax).quantize(quantizer, rounding=rounding)
     return subtotal, tax, total
 
 
+def recompute_line_totals(qty, unit_price, gst_rate) -> Tuple[Decimal, Decimal, Decimal]:
+    """Recompute line-level totals using configured rounding policies."""
+    quantizer, rounding = _get_rounding()
+    return _line_totals(qty, unit_price, gst_rate, quantizer, rounding)
+
+
+def recompute_line_totals_batch(
+    qtys: Iterable, unit_prices: Iterable, gst_rates: Iterable
+) -> List[Tuple[Decimal, Decimal, Decimal]]:
+    """Recompute many lines at once, resolving the rounding policy a single time.
+
+    Results match ``recompute_line_totals`` element-wise; the arithmetic stays in
+    ``Decimal`` so configured rounding modes are honoured exactly.
+    """
+    quantizer, rounding = _get_rounding()
+    return [
+        _line_totals(qty, unit_price, gst_rate, quantizer, rounding)
+        for qty, unit_price, gst_rate in zip(qtys, unit_prices, gst_rates)
+    ]
+
+
 def recompute_invoice_totals(lines: Iterable[Dict[str, Decimal | None]]) -> Tuple[Decimal, Decimal, Decimal, Dict[str, List[Dict[str, Decimal]]]]:
     """Aggregate invoice totals and capture line-level diffs."""
-    places, rounding = _get_rounding()
-    subtotal = Decimal(0)
-    tax_total = Decimal(0)
-    grand_total = Decimal(0)
+    quantizer, rounding = _get_rounding()
+    subtotal = _ZERO
+    tax_total = _ZERO
+    grand_total = _ZERO
     diffs: List[Dict[str, Decimal]] = []
     for line in lines:
         line_no = line.get("line_no")
-        qty = line.get("qty") or Decimal(0)
-        unit_price = line.get("unit_price") or Decimal(0)
-        gst_rate = line.get("gst_rate") or Decimal(0)
+        qty = line.get("qty") or _ZERO
+        unit_price = line.get("unit_price") or _ZERO
+        gst_rate = line.get("gst_rate") or _ZERO
         stored_subtotal = Decimal(line.get("line_subtotal") or 0)
         stored_tax = Decimal(line.get("line_tax") or 0)
         stored_total = Decimal(line.get("line_total") or 0)
-        expected_subtotal, expected_tax, expected_total = recompute_line_totals(qty, unit_price, gst_rate)
+        expected_subtotal, expected_tax, expected_total = _line_totals(qty, unit_price, gst_rate, quantizer, rounding)
         subtotal += expected_subtotal
         tax_total += expected_tax
         grand_total += expected_total
@@ -69,7 +93,7 @@ def recompute_invoice_totals(lines: Iterable[Dict[str, Decimal | None]]) -> Tupl
             }
         )
 
-    subtotal = _quantize(subtotal, places, rounding)
-    tax_total = _quantize(tax_total, places, rounding)
-    grand_total = _quantize(grand_total, places, rounding)
+    subtotal = subtotal.quantize(quantizer, rounding=rounding)
+    tax_total = tax_total.quantize(quantizer, rounding=rounding)
+    grand_total = grand_total.quantize(quantizer, rounding=rounding)
     return subtotal, tax_total, grand_total, {"lines": diffs}
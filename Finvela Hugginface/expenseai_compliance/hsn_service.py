@@ -1,17 +1,31 @@
 """Services for loading and querying HSN/SAC rate tables."""
 from __future__ import annotations
 
-import csv
+import time
+from dataclasses import dataclass
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import BinaryIO, Dict, Iterable, Tuple
 
 from flask import current_app
+from sqlalchemy import insert, text
 
-from expenseai_ext.db import db
+from expenseai_ext.csv_rows import iter_csv_rows
+from expenseai_ext.db import db, dialect_name, pg_upsert
 from expenseai_models.hsn_rate import HsnRate
 
+_UPSERT_BATCH_SIZE = 500
+_CSV_COLUMNS = ("code", "gst_rate", "effective_from", "effective_to", "description")
+_REQUIRED_COLUMNS = ("code", "gst_rate", "effective_from")
+_STATS_TTL = 30.0
+
+_RATE_CACHE_TTL = 300.0
+_RATE_CACHE_SIZE = 4096
+
+_stats_cache: tuple[float, Dict[str, int | str | None]] | None = None
+_rate_cache: Dict[Tuple[str, date], Tuple[float, RateEntry | None]] = {}
+
 
 def load_default_rates() -> Tuple[int, int]:
     """Load initial rates from the configured CSV path if present."""
@@ -21,91 +35,197 @@ def load_default_rates() -> Tuple[int, int]:
     path = Path(source)
     if not path.exists():
         return (0, 0)
-    with path.open("r", encoding="utf-8") as handle:
+    with path.open("rb") as handle:
         return refresh_rates(handle)
 
 
-def refresh_rates(file_obj, replace_existing: bool = True) -> Tuple[int, int]:
-    """Load HSN rates from a CSV file-like object.
+def refresh_rates(file_obj: BinaryIO, replace_existing: bool = True) -> Tuple[int, int]:
+    """Load HSN rates from a binary UTF-8 CSV stream.
 
     Returns a tuple of (inserted, updated).
     """
-    reader = csv.DictReader(file_obj)
     inserted = 0
     updated = 0
-    required_columns = {"code", "gst_rate", "effective_from"}
-    if not required_columns.issubset({col.strip() for col in reader.fieldnames or []}):
-        missing = required_columns - set(reader.fieldnames or [])
-        raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
-
-    for row in reader:
-        code = row.get("code", "").strip().upper()
-        if not code:
-            current_app.logger.warning("Skipping HSN rate row without code", extra={"row": row})
-            continue
-        try:
-            gst_rate = Decimal(row.get("gst_rate", "0").strip())
-        except (InvalidOperation, ValueError) as exc:
-            current_app.logger.warning("Invalid GST rate", extra={"row": row, "error": str(exc)})
-            continue
-        try:
-            effective_from = datetime.strptime(row.get("effective_from", ""), "%Y-%m-%d").date()
-        except ValueError:
-            current_app.logger.warning("Invalid effective_from date", extra={"row": row})
-            continue
-        effective_to_value = row.get("effective_to")
-        effective_to = None
-        if effective_to_value:
+    use_upsert = dialect_name() == "postgresql"
+    pending: dict[tuple[str, date], dict[str, object]] = {}
+    new_rows: dict[tuple[str, date], dict[str, object]] = {}
+    if use_upsert:
+        # A reload is replayable from its CSV, so it need not wait on WAL sync.
+        db.session.execute(text("SET LOCAL synchronous_commit = off"))
+    # New rows are collected in new_rows rather than added to the session, so
+    # the per-row lookups below never need to flush.
+    with db.session.no_autoflush:
+        for row in iter_csv_rows(file_obj, _CSV_COLUMNS, required=_REQUIRED_COLUMNS):
+            code_raw, gst_rate_raw, effective_from_raw, effective_to_value, description = row
+            code = code_raw.strip().upper()
+            if not code:
+                current_app.logger.warning(
+                    "Skipping HSN rate row without code", extra={"row": dict(zip(_CSV_COLUMNS, row))}
+                )
+                continue
             try:
-                effective_to = datetime.strptime(effective_to_value, "%Y-%m-%d").date()
+                gst_rate = Decimal(gst_rate_raw.strip())
+            except (InvalidOperation, ValueError) as exc:
+                current_app.logger.warning(
+                    "Invalid GST rate", extra={"row": dict(zip(_CSV_COLUMNS, row)), "error": str(exc)}
+                )
+                continue
+            try:
+                effective_from = datetime.strptime(effective_from_raw, "%Y-%m-%d").date()
             except ValueError:
-                current_app.logger.warning("Invalid effective_to date", extra={"row": row})
-                effective_to = None
-
-        description = row.get("description")
-        existing = (
-            HsnRate.query.filter_by(code=code, effective_from=effective_from)
-            .order_by(HsnRate.id.asc())
-            .first()
-        )
-        if existing:
-            if replace_existing:
-                existing.description = description
-                existing.gst_rate = gst_rate
-                existing.effective_to = effective_to
-                updated += 1
-            continue
-
-        db.session.add(
-            HsnRate(
-                code=code,
-                description=description,
-                gst_rate=gst_rate,
-                effective_from=effective_from,
-                effective_to=effective_to,
+                current_app.logger.warning("Invalid effective_from date", extra={"row": dict(zip(_CSV_COLUMNS, row))})
+                continue
+            effective_to = None
+            if effective_to_value:
+                try:
+                    effective_to = datetime.strptime(effective_to_value, "%Y-%m-%d").date()
+                except ValueError:
+                    current_app.logger.warning("Invalid effective_to date", extra={"row": dict(zip(_CSV_COLUMNS, row))})
+                    effective_to = None
+
+            key = (code, effective_from)
+            values = {
+                "code": code,
+                "description": description or None,
+                "gst_rate": gst_rate,
+                "effective_from": effective_from,
+                "effective_to": effective_to,
+            }
+            if use_upsert:
+                if key in pending:
+                    if not replace_existing:
+                        continue
+                    updated += 1
+                pending[key] = values
+                if len(pending) >= _UPSERT_BATCH_SIZE:
+                    batch_inserted, batch_updated = _upsert_batch(pending, replace_existing)
+                    inserted += batch_inserted
+                    updated += batch_updated
+                    pending = {}
+                continue
+
+            if key in new_rows:
+                if replace_existing:
+                    new_rows[key] = values
+                    updated += 1
+                continue
+
+            existing = (
+                HsnRate.query.filter_by(code=code, effective_from=effective_from)
+                .order_by(HsnRate.id.asc())
+                .first()
             )
-        )
-        inserted += 1
+            if existing:
+                if replace_existing:
+                    existing.description = values["description"]
+                    existing.gst_rate = gst_rate
+                    existing.effective_to = effective_to
+                    updated += 1
+                continue
+
+            new_rows[key] = values
+            inserted += 1
+    if pending:
+        batch_inserted, batch_updated = _upsert_batch(pending, replace_existing)
+        inserted += batch_inserted
+        updated += batch_updated
+    if new_rows:
+        db.session.execute(insert(HsnRate), list(new_rows.values()))
     db.session.commit()
+    _invalidate_caches()
     return inserted, updated
 
 
-def get_rate(code: str | None, on_date: date | None) -> HsnRate | None:
+def _upsert_batch(pending: dict[tuple[str, date], dict[str, object]], replace_existing: bool) -> Tuple[int, int]:
+    """Merge a batch of parsed rows with ``INSERT ... ON CONFLICT`` on PostgreSQL."""
+    return pg_upsert(
+        HsnRate,
+        list(pending.values()),
+        conflict_columns=("code", "effective_from"),
+        update=replace_existing,
+    )
+
+
+def _invalidate_caches() -> None:
+    global _stats_cache
+    _stats_cache = None
+    _rate_cache.clear()
+
+
+@dataclass(frozen=True, slots=True)
+class RateEntry:
+    """Detached copy of an ``HsnRate`` row that is safe to share across sessions."""
+
+    code: str
+    gst_rate: Decimal
+    effective_from: date
+    effective_to: date | None
+    description: str | None
+
+
+def get_rate(code: str | None, on_date: date | None) -> RateEntry | None:
     """Return the matching HSN rate entry for the given code and date."""
     if not code:
         return None
     normalized = code.strip().upper()
     if not normalized:
         return None
-    query = HsnRate.query.filter(HsnRate.code == normalized)
+    return get_rates([normalized], on_date).get(normalized)
+
+
+def get_rates(codes: Iterable[str | None], on_date: date | None) -> Dict[str, RateEntry]:
+    """Return the rate in force on ``on_date`` for each code, keyed by normalized code.
+
+    Lookups are cached per (code, date) for ``_RATE_CACHE_TTL`` seconds; uploads
+    through ``refresh_rates`` clear the cache immediately.
+    """
+    normalized = {code.strip().upper() for code in codes if code and code.strip()}
+    if not normalized:
+        return {}
     when = on_date or date.today()
-    query = query.filter(HsnRate.effective_from <= when)
-    query = query.filter((HsnRate.effective_to.is_(None)) | (HsnRate.effective_to >= when))
-    return query.order_by(HsnRate.effective_from.desc()).first()
+    now = time.monotonic()
+    rates: Dict[str, RateEntry] = {}
+    missing: set[str] = set()
+    for code in normalized:
+        cached = _rate_cache.get((code, when))
+        if cached is not None and now - cached[0] < _RATE_CACHE_TTL:
+            if cached[1] is not None:
+                rates[code] = cached[1]
+        else:
+            missing.add(code)
+    if not missing:
+        return rates
+
+    query = (
+        HsnRate.query.filter(HsnRate.code.in_(missing))
+        .filter(HsnRate.effective_from <= when)
+        .filter((HsnRate.effective_to.is_(None)) | (HsnRate.effective_to >= when))
+        .order_by(HsnRate.code, HsnRate.effective_from.desc())
+    )
+    fetched: Dict[str, RateEntry] = {}
+    for rate in query:
+        if rate.code not in fetched:
+            fetched[rate.code] = RateEntry(
+                code=rate.code,
+                gst_rate=rate.gst_rate,
+                effective_from=rate.effective_from,
+                effective_to=rate.effective_to,
+                description=rate.description,
+            )
+    if len(_rate_cache) + len(missing) > _RATE_CACHE_SIZE:
+        _rate_cache.clear()
+    for code in missing:
+        _rate_cache[(code, when)] = (now, fetched.get(code))
+    rates.update(fetched)
+    return rates
 
 
 def stats() -> Dict[str, int | str | None]:
     """Return simple statistics about the loaded rates for admin dashboards."""
+    global _stats_cache
+    now = time.monotonic()
+    if _stats_cache is not None and now - _stats_cache[0] < _STATS_TTL:
+        return _stats_cache[1]
     total = HsnRate.query.count()
     latest = (
         db.session.query(HsnRate.effective_from)
@@ -113,4 +233,6 @@ def stats() -> Dict[str, int | str | None]:
         .limit(1)
         .scalar()
     )
-    return {"count": total, "latest_effective_from": latest.isoformat() if latest else None}
+    result = {"count": total, "latest_effective_from": latest.isoformat() if latest else None}
+    _stats_cache = (now, result)
+    return result
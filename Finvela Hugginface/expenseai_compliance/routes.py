@@ -1,10 +1,10 @@
 """Blueprint routes for compliance administration."""
 from __future__ import annotations
 
-import io
-from datetime import datetime
+import hashlib
+from datetime import date, datetime
 
-from flask import Response, current_app, flash, redirect, render_template, url_for
+from flask import Response, current_app, flash, redirect, render_template, request, url_for
 from flask_login import login_required
 
 from expenseai_compliance import compliance_admin_bp
@@ -13,6 +13,8 @@ from expenseai_compliance import hsn_service
 from expenseai_ext import auth as auth_ext
 from expenseai_ext.db import db
 
+_sample_cache: tuple[date, bytes, str] | None = None
+
 
 @compliance_admin_bp.route("/compliance/hsn", methods=["GET", "POST"])
 @login_required
@@ -20,27 +22,22 @@ from expenseai_ext.db import db
 def hsn_upload() -> str | Response:
     """Render the HSN upload page and handle form submissions."""
     form = HsnUploadForm()
-    stats = hsn_service.stats()
 
     if form.validate_on_submit():
         file_storage = form.file.data
         try:
             file_storage.stream.seek(0)
-            payload = file_storage.stream.read()
-            if isinstance(payload, str):
-                decoded = payload
-            else:
-                decoded = payload.decode("utf-8-sig")
             inserted, updated = hsn_service.refresh_rates(
-                io.StringIO(decoded), replace_existing=form.replace_existing.data
+                file_storage.stream, replace_existing=form.replace_existing.data
             )
-            stats = hsn_service.stats()
             flash(
                 f"HSN catalog updated. Inserted {inserted} rows, updated {updated} rows.",
                 "success",
             )
             return redirect(url_for("expenseai_compliance_admin.hsn_upload"))
         except UnicodeDecodeError:
+            # Rows are decoded while earlier batches are already flushed, so
+            # a late decode error still has writes to undo.
             current_app.logger.exception("Failed to decode HSN CSV upload")
             db.session.rollback()
             flash("Could not decode file. Ensure it is UTF-8 encoded.", "danger")
@@ -52,7 +49,7 @@ def hsn_upload() -> str | Response:
     if form.errors:
         flash(next(iter(form.errors.values()))[0], "warning")
 
-    return render_template("compliance_admin/hsn_upload.html", form=form, stats=stats)
+    return render_template("compliance_admin/hsn_upload.html", form=form, stats=hsn_service.stats())
 
 
 @compliance_admin_bp.route("/compliance/hsn/sample", methods=["GET"])
@@ -60,11 +57,20 @@ def hsn_upload() -> str | Response:
 @auth_ext.roles_required("admin")
 def sample_hsn_csv() -> Response:
     """Provide a sample HSN CSV for administrators."""
-    now = datetime.utcnow().date().isoformat()
-    sample = (
-        "code,gst_rate,effective_from,effective_to,description\n"
-        f"8523,18.0,{now},,Data processing units\n"
-    )
-    response = current_app.response_class(sample, mimetype="text/csv")
+    body, etag = _sample_csv(datetime.utcnow().date())
+    response = current_app.response_class(body, mimetype="text/csv")
     response.headers["Content-Disposition"] = "attachment; filename=hsn_sample.csv"
-    return response
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def _sample_csv(today: date) -> tuple[bytes, str]:
+    """Return the sample CSV body and its ETag, rebuilt once per day."""
+    global _sample_cache
+    if _sample_cache is None or _sample_cache[0] != today:
+        body = (
+            "code,gst_rate,effective_from,effective_to,description\n"
+            f"8523,18.0,{today.isoformat()},,Data processing units\n"
+        ).encode("utf-8")
+        _sample_cache = (today, body, hashlib.sha1(body).hexdigest())
+    return _sample_cache[1], _sample_cache[2]
@@ -38,4 +38,7 @@ def run_counterfactual(invoice_id: int):
         current_app.logger.exception("Counterfactual evaluation failed", extra={"invoice_id": invoice_id})
         return jsonify({"status": "error", "message": "Counterfactual evaluation failed"}), HTTPStatus.INTERNAL_SERVER_ERROR
 
-    return jsonify({"status": "ok", "result": result.model_dump()})
+    # pydantic-core serializes the result directly; splice it into the envelope
+    # rather than round-tripping through model_dump() and the stdlib encoder.
+    body = '{"status": "ok", "result": ' + result.model_dump_json() + "}"
+    return current_app.response_class(body, mimetype="application/json")
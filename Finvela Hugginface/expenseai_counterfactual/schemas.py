@@ -4,7 +4,7 @@ from __future__ import annotations
 from decimal import Decimal
 from typing import List, Optional
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator, model_validator
 
 
 class CounterfactLineChange(BaseModel):
@@ -31,11 +31,11 @@ class CounterfactRequest(BaseModel):
     @field_validator("line_changes")
     @classmethod
     def ensure_unique_lines(cls, value: List[CounterfactLineChange]) -> List[CounterfactLineChange]:
-        seen: set[int] = set()
-        for change in value:
-            if change.line_no in seen:
-                raise ValueError(f"Duplicate line_no {change.line_no} in counterfactual request")
-            seen.add(change.line_no)
+        line_nos = [change.line_no for change in value]
+        if len(set(line_nos)) != len(line_nos):
+            seen: set[int] = set()
+            duplicate = next(line_no for line_no in line_nos if line_no in seen or seen.add(line_no))
+            raise ValueError(f"Duplicate line_no {duplicate} in counterfactual request")
         return value
 
     @model_validator(mode="after")
@@ -50,7 +50,9 @@ class CounterfactTotals(BaseModel):
     tax_total: Decimal
     grand_total: Decimal
 
-    model_config = ConfigDict(json_encoders={Decimal: lambda v: float(v)})
+    @field_serializer("subtotal", "tax_total", "grand_total")
+    def _as_float(self, value: Decimal) -> float:
+        return float(value)
 
 
 class CounterfactContributor(BaseModel):
@@ -77,5 +79,3 @@ class CounterfactResponse(BaseModel):
     risk_after: CounterfactRiskSnapshot
     delta_composite: float
     notes: List[str] = Field(default_factory=list)
-
-    model_config = ConfigDict(json_encoders={Decimal: lambda v: float(v)})
@@ -1,17 +1,204 @@
 """Database helpers including SQLAlchemy and Flask-Migrate wiring."""
 from __future__ import annotations
 
+from datetime import datetime
+from typing import Any, Iterable, Sequence
+
 from flask import Flask
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Index, Table, and_, exists, func, inspect, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError
 
 # Initialize the extensions without an app bound so they can be configured
 # inside the application factory.
 db = SQLAlchemy()
 migrate = Migrate()
 
+# Columns and indexes added to tables that already existed in earlier releases.
+# ``create_all`` never alters an existing table, so ``apply_schema_backfills`` adds
+# them on startup. New columns must be nullable. Unique indexes may require
+# deleting duplicate rows and are only reported at startup; ``flask manage
+# create-unique-indexes`` builds them.
+SCHEMA_BACKFILL_COLUMNS: dict[str, tuple[str, ...]] = {
+    "line_items": ("description_norm_canonical",),
+    "invoices": ("duplicate_snapshot", "line_signature", "po_numbers_norm"),
+}
+SCHEMA_BACKFILL_INDEXES: dict[str, tuple[str, ...]] = {
+    "external_benchmarks": ("uq_external_benchmark_key",),
+    "item_price_history": ("ix_iph_norm_org_cur_date",),
+    "invoices": (
+        "ix_invoice_org_created",
+        "ix_invoice_org_vendor_invoice",
+        "ix_invoice_org_line_signature",
+        "ix_invoice_po_numbers_norm_gin",
+    ),
+}
+
 
 def init_app(app: Flask) -> None:
     """Bind SQLAlchemy and Flask-Migrate to the provided application."""
     db.init_app(app)
     migrate.init_app(app, db)
+
+
+def apply_schema_backfills(app: Flask) -> None:
+    """Add backfilled columns and indexes that are missing from existing tables."""
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+    for table_name, column_names in SCHEMA_BACKFILL_COLUMNS.items():
+        table = db.metadata.tables.get(table_name)
+        if table is None or table_name not in existing_tables:
+            continue
+        present = {column["name"] for column in inspector.get_columns(table_name)}
+        for name in column_names:
+            if name in present:
+                continue
+            column = table.c[name]
+            statement = "ALTER TABLE {} ADD COLUMN {} {}".format(
+                preparer.format_table(table),
+                preparer.format_column(column),
+                column.type.compile(dialect=engine.dialect),
+            )
+            try:
+                with engine.begin() as connection:
+                    connection.exec_driver_sql(statement)
+            except DBAPIError:
+                app.logger.exception("Schema backfill failed", extra={"table": table_name, "column": name})
+                continue
+            app.logger.info("Added missing column %s to %s", name, table_name)
+    for table_name, index_names in SCHEMA_BACKFILL_INDEXES.items():
+        table = db.metadata.tables.get(table_name)
+        if table is None or table_name not in existing_tables:
+            continue
+        present = {index["name"] for index in inspector.get_indexes(table_name)}
+        for index in table.indexes:
+            if index.name not in index_names or index.name in present:
+                continue
+            if index.unique:
+                app.logger.warning(
+                    "Unique index %s is missing on %s; run 'flask manage create-unique-indexes'",
+                    index.name,
+                    table_name,
+                )
+                continue
+            try:
+                with engine.begin() as connection:
+                    index.create(connection, checkfirst=True)
+                    # dialect-restricted indexes (ddl_if) are skipped by create()
+                    created = inspect(connection).has_index(table_name, index.name)
+            except DBAPIError:
+                app.logger.exception("Schema backfill failed", extra={"table": table_name, "index": index.name})
+                continue
+            if created:
+                app.logger.info("Added missing index %s to %s", index.name, table_name)
+
+
+def missing_unique_indexes() -> list[Index]:
+    """Return backfilled unique indexes that existing tables still lack."""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    missing: list[Index] = []
+    for table_name, index_names in SCHEMA_BACKFILL_INDEXES.items():
+        table = db.metadata.tables.get(table_name)
+        if table is None or table_name not in existing_tables:
+            continue
+        present = {index["name"] for index in inspector.get_indexes(table_name)}
+        missing.extend(
+            index
+            for index in table.indexes
+            if index.unique and index.name in index_names and index.name not in present
+        )
+    return missing
+
+
+def count_duplicate_keys(index: Index) -> int:
+    """Count rows that repeat an older row's key and would block ``index``."""
+    stmt = select(func.count()).select_from(index.table).where(_repeats_older_key(index))
+    with db.engine.connect() as connection:
+        return connection.execute(stmt).scalar_one()
+
+
+def create_unique_index(index: Index) -> int:
+    """Delete rows repeating the index key, keeping the oldest, then build the index.
+
+    Both steps run in one transaction. Returns the number of rows deleted.
+    """
+    with db.engine.begin() as connection:
+        removed = connection.execute(index.table.delete().where(_repeats_older_key(index))).rowcount
+        index.create(connection, checkfirst=True)
+    _present_indexes.add((index.table.name, index.name))
+    return removed
+
+
+def _repeats_older_key(index: Index) -> Any:
+    # NULLs never compare equal, matching how a unique index treats them
+    table: Table = index.table
+    older = table.alias("older")
+    same_key = [older.c[column.name] == column for column in index.columns]
+    return exists().where(and_(older.c.id < table.c.id, *same_key))
+
+
+# (table, index) pairs seen to exist; only positive results are kept because
+# ``create-unique-indexes`` runs in another process.
+_present_indexes: set[tuple[str, str]] = set()
+
+
+def has_index(table_name: str, index_name: str) -> bool:
+    """Return True when the bound database has the named index."""
+    key = (table_name, index_name)
+    if key in _present_indexes:
+        return True
+    if inspect(db.session.get_bind()).has_index(table_name, index_name):
+        _present_indexes.add(key)
+        return True
+    return False
+
+
+def dialect_name() -> str:
+    """Return the dialect name of the engine bound to the current session."""
+    return db.session.get_bind().dialect.name
+
+
+def pg_upsert(
+    model: type,
+    rows: Sequence[dict[str, Any]],
+    *,
+    conflict_columns: Iterable[str],
+    update: bool = True,
+) -> tuple[int, int]:
+    """Merge ``rows`` with one ``INSERT ... ON CONFLICT`` statement (PostgreSQL only).
+
+    Returns ``(inserted, updated)``. Rows must not repeat a conflict key and the
+    conflict columns must be backed by a unique index.
+    """
+    if not rows:
+        return 0, 0
+    table = model.__table__
+    now = datetime.utcnow()
+    stamped = [_with_timestamps(table, row, now) for row in rows]
+    conflict = list(conflict_columns)
+    stmt = pg_insert(table).values(stamped)
+    if update:
+        skip = {"id", "created_at", *conflict}
+        stmt = stmt.on_conflict_do_update(
+            index_elements=conflict,
+            set_={name: stmt.excluded[name] for name in stamped[0] if name not in skip},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=conflict)
+    # ``xmax = 0`` only holds for freshly inserted tuples, which distinguishes inserts from updates.
+    flags = db.session.execute(stmt.returning(literal_column("xmax = 0"))).scalars().all()
+    inserted = sum(1 for flag in flags if flag)
+    return inserted, len(flags) - inserted
+
+
+def _with_timestamps(table, row: dict[str, Any], now: datetime) -> dict[str, Any]:
+    stamped = dict(row)
+    for column in ("created_at", "updated_at"):
+        if column in table.c and column not in stamped:
+            stamped[column] = now
+    return stamped
@@ -1,16 +1,37 @@
 """Structured logging helpers used by the Flask application."""
 from __future__ import annotations
 
+import atexit
+import copy
 import json
 import logging
+import os
+import queue
+import sys
+import threading
+import weakref
 from datetime import datetime
-from typing import Any, Dict
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, TextIO
 
 from flask import Flask, current_app, g, has_request_context, request
 from flask_login import current_user
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+
 
 SLOW_THRESHOLD_MS = 1000
+DEFAULT_LOG_QUEUE_MAXLEN = 20000
+LOG_FLUSH_BYTES = 64 * 1024
+LOG_FLUSH_INTERVAL_S = 0.2
+
+_ts_minute_prefix: tuple[int, str] = (-1, "")
+# Running listeners, restarted in forked children (Celery prefork workers,
+# gunicorn --preload): a child inherits the queue but not the threads draining it.
+_running_listeners: "weakref.WeakSet[_DropReportingListener]" = weakref.WeakSet()
 
 
 class StructuredFormatter(logging.Formatter):
@@ -19,16 +40,32 @@ class StructuredFormatter(logging.Formatter):
     def __init__(self, as_json: bool = True) -> None:
         super().__init__()
         self.as_json = as_json
+        # One encoder for every record; ``default=str`` covers Decimal/datetime extras.
+        if orjson is not None:
+            self._encode = _orjson_encode
+        else:
+            self._encode = json.JSONEncoder(
+                ensure_ascii=True,
+                separators=(",", ":"),
+                check_circular=False,
+                default=str,
+            ).encode
 
     def format(self, record: logging.LogRecord) -> str:  # noqa: D401
         payload = _record_payload(record)
         if record.exc_info:
             payload["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exception"] = record.exc_text
         if self.as_json:
-            return json.dumps(payload, ensure_ascii=True)
+            return self._encode(payload)
         return _format_plain(payload)
 
 
+def _orjson_encode(payload: Dict[str, Any]) -> str:
+    return orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 def _format_plain(payload: Dict[str, Any]) -> str:
     parts = [f"[{payload['level']}]", payload.get("msg", "").strip()]
     route = payload.get("route")
@@ -49,32 +86,31 @@ def _format_plain(payload: Dict[str, Any]) -> str:
     return " ".join(parts)
 
 
+def _format_timestamp(created: float) -> str:
+    """Render ``created`` as ISO-8601 UTC, formatting the date part once per minute."""
+    global _ts_minute_prefix
+    seconds = int(created)
+    minute = seconds // 60
+    cached_minute, prefix = _ts_minute_prefix
+    if minute != cached_minute:
+        prefix = datetime.utcfromtimestamp(minute * 60).strftime("%Y-%m-%dT%H:%M:")
+        _ts_minute_prefix = (minute, prefix)  # single tuple swap, safe across threads
+    micros = int((created - seconds) * 1_000_000)
+    return f"{prefix}{seconds % 60:02d}.{micros:06d}Z"
+
+
 def _record_payload(record: logging.LogRecord) -> Dict[str, Any]:
     payload: Dict[str, Any] = {
-        "ts": datetime.utcnow().isoformat() + "Z",
+        "ts": _format_timestamp(record.created),
         "level": record.levelname,
         "msg": record.getMessage(),
         "component": getattr(record, "component", "app"),
         "invoice_id": getattr(record, "invoice_id", None),
     }
-    if has_request_context():
-        payload["request_id"] = getattr(g, "request_id", None)
-        payload["route"] = request.path
-        payload["method"] = request.method
-        payload["ip"] = request.remote_addr
-        payload["ua"] = request.user_agent.string
-        if getattr(current_user, "is_authenticated", False):
-            try:
-                payload["user_id"] = current_user.get_id()
-            except Exception:  # pragma: no cover - defensive
-                payload["user_id"] = None
-        payload.update(getattr(g, "log_context", {}))
-        latency_ms = getattr(g, "request_latency_ms", None)
-        if latency_ms is not None:
-            payload["latency_ms"] = latency_ms
-        status = getattr(g, "response_status_code", None)
-        if status is not None:
-            payload["status"] = status
+    request_context = getattr(record, "request_context", None)
+    if request_context is None:
+        request_context = _request_context()
+    payload.update(request_context)
     for attr in ("latency_ms", "status"):
         value = getattr(record, attr, None)
         if value is not None:
@@ -85,19 +121,265 @@ def _record_payload(record: logging.LogRecord) -> Dict[str, Any]:
     return {k: v for k, v in payload.items() if v is not None}
 
 
+def _request_fields() -> Dict[str, Any]:
+    return {
+        "route": request.path,
+        "method": request.method,
+        "ip": request.remote_addr,
+        "ua": request.user_agent.string,
+    }
+
+
+def _snapshot_request_fields() -> None:
+    # The request line never changes mid-request, so resolve the ``request``
+    # proxies once instead of on every log call.
+    g.log_ctx_snapshot = _request_fields()
+
+
+def _request_context() -> Dict[str, Any]:
+    """Collect the request-scoped log fields; empty outside a request."""
+    if not has_request_context():
+        return {}
+    snapshot = getattr(g, "log_ctx_snapshot", None)
+    if snapshot is None:  # logged before the before_request hook ran
+        snapshot = _request_fields()
+    context: Dict[str, Any] = {"request_id": getattr(g, "request_id", None)}
+    context.update(snapshot)
+    if getattr(current_user, "is_authenticated", False):
+        try:
+            context["user_id"] = current_user.get_id()
+        except Exception:  # pragma: no cover - defensive
+            context["user_id"] = None
+    context.update(getattr(g, "log_context", {}))
+    latency_ms = getattr(g, "request_latency_ms", None)
+    if latency_ms is not None:
+        context["latency_ms"] = latency_ms
+    status = getattr(g, "response_status_code", None)
+    if status is not None:
+        context["status"] = status
+    return context
+
+
+class _ContextQueueHandler(QueueHandler):
+    """Queue handler that snapshots request context before a record leaves the thread.
+
+    The listener thread has no request context, so everything ``_record_payload``
+    needs from ``g``/``request`` is captured here. The message is merged with its
+    args and any traceback rendered to ``exc_text`` so the record pickles cleanly
+    and the formatter still reports it under ``exception``.
+    """
+
+    _exception_formatter = logging.Formatter()
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self._dropped_lock = threading.Lock()
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Never block the request thread on a stalled sink: drop and count instead.
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        record.request_context = _request_context()
+        return record
+
+
+class BatchedStreamHandler(logging.Handler):
+    """Stream handler that buffers formatted records and writes them in batches.
+
+    The buffer is written once it holds ``flush_bytes`` of text or, at the
+    latest, every ``interval`` seconds by a daemon flusher thread, so bursts cost
+    one ``write``/``flush`` pair instead of one per record. When the stream
+    exposes a binary ``buffer`` (as ``sys.stderr`` does) batches are written to it
+    as UTF-8 bytes, bypassing the text layer and whatever encoding the locale
+    gave stderr.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        *,
+        flush_bytes: int = LOG_FLUSH_BYTES,
+        interval: float = LOG_FLUSH_INTERVAL_S,
+    ) -> None:
+        super().__init__()
+        self.stream = stream if stream is not None else sys.stderr
+        self._binary = getattr(self.stream, "buffer", None)
+        self.flush_bytes = flush_bytes
+        self._interval = interval
+        self._buffer: list[str] = []
+        self._nbytes = 0
+        self._start_flusher()
+
+    def _start_flusher(self) -> None:
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically,
+            args=(self._interval,),
+            name="log-flusher",
+            daemon=True,
+        )
+        self._flusher.start()
+
+    def restart_after_fork(self) -> None:
+        """Start a flusher in a forked child; lines buffered by the parent are its to write."""
+        self._buffer.clear()
+        self._nbytes = 0
+        self._start_flusher()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record) + "\n"
+        except Exception:
+            self.handleError(record)
+            return
+        with self.lock:
+            self._buffer.append(line)
+            self._nbytes += len(line)
+            full = self._nbytes >= self.flush_bytes
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            if not self._buffer:
+                return
+            chunk = "".join(self._buffer)
+            self._buffer.clear()
+            self._nbytes = 0
+            try:
+                if self._binary is not None:
+                    self.stream.flush()  # keep ordering with anything written as text
+                    self._binary.write(chunk.encode("utf-8", "backslashreplace"))
+                    self._binary.flush()
+                else:
+                    self.stream.write(chunk)
+                    self.stream.flush()
+            except Exception:  # pragma: no cover - mirror StreamHandler's tolerance
+                pass
+
+    def close(self) -> None:
+        self._closed.set()
+        self.flush()
+        super().close()
+
+    def _flush_periodically(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            self.flush()
+
+
+class _DropReportingListener(QueueListener):
+    """Listener that reports records dropped by a full queue before the next one."""
+
+    def __init__(self, log_queue: queue.Queue, handler: logging.Handler, source: _ContextQueueHandler) -> None:
+        super().__init__(log_queue, handler, respect_handler_level=True)
+        self._source = source
+        self._reported = 0
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)  # block: the queue may be full at shutdown
+
+    def start(self) -> None:
+        super().start()
+        _running_listeners.add(self)
+
+    def stop(self) -> None:
+        if self._thread is not None:  # idempotent: also registered with atexit
+            super().stop()
+        _running_listeners.discard(self)
+
+    def restart_after_fork(self) -> None:
+        """Give a forked child its own queue, flusher and listener thread.
+
+        The inherited queue may hold records (or a lock) from the parent, so it
+        is replaced rather than reused.
+        """
+        self.queue = self._source.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._source._dropped_lock = threading.Lock()
+        self._source.dropped = 0
+        self._reported = 0
+        for handler in self.handlers:
+            if isinstance(handler, BatchedStreamHandler):
+                handler.restart_after_fork()
+        self._thread = None
+        self.start()
+
+    def handle(self, record: logging.LogRecord) -> None:
+        dropped = self._source.dropped
+        if dropped != self._reported:
+            super().handle(
+                logging.makeLogRecord(
+                    {
+                        "name": record.name,
+                        "levelno": logging.WARNING,
+                        "levelname": "WARNING",
+                        "msg": f"logging buffer full - dropped {dropped - self._reported} log records",
+                        "component": "logging",
+                        "request_context": {},
+                    }
+                )
+            )
+            self._reported = dropped
+        super().handle(record)
+
+
+def _restart_listeners_after_fork() -> None:
+    for listener in list(_running_listeners):
+        listener.restart_after_fork()
+
+
+# logging registers its own hook first, so handler locks are already reset here
+os.register_at_fork(after_in_child=_restart_listeners_after_fork)
+
+
 def configure_logging(app: Flask) -> None:
-    """Configure application logging based on the current environment."""
+    """Configure application logging based on the current environment.
+
+    Records are formatted and written by a ``QueueListener`` thread; request
+    threads only snapshot context and enqueue. The queue holds at most
+    ``LOG_QUEUE_MAXLEN`` records and further records are dropped (and counted)
+    rather than blocking the caller. Forked worker processes restart the
+    listener and flusher threads in the child.
+    """
 
     level_name = app.config.get("LOG_LEVEL", "INFO").upper()
     level = getattr(logging, level_name, logging.INFO)
     app.logger.setLevel(level)
 
     use_json = app.config.get("LOG_FORMAT", "json").lower() == "json"
-    handler = logging.StreamHandler()
+    handler = BatchedStreamHandler()
     handler.setFormatter(StructuredFormatter(as_json=use_json))
 
+    previous = app.extensions.pop("log_listener", None)
+    if previous is not None:
+        previous.stop()
+        atexit.unregister(previous.stop)
+        for previous_handler in previous.handlers:
+            previous_handler.close()
+    maxlen = int(app.config.get("LOG_QUEUE_MAXLEN", DEFAULT_LOG_QUEUE_MAXLEN))
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=maxlen)
+    queue_handler = _ContextQueueHandler(log_queue)
+    listener = _DropReportingListener(log_queue, handler, queue_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    app.extensions["log_listener"] = listener
+
     app.logger.handlers.clear()
-    app.logger.addHandler(handler)
+    app.logger.addHandler(queue_handler)
+
+    if _snapshot_request_fields not in app.before_request_funcs.get(None, []):
+        app.before_request(_snapshot_request_fields)
 
 
 def log_info(message: str, *, component: str = "app", **extra: Any) -> None:
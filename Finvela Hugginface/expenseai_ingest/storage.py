@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 import io
-import hashlib
+import shutil
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
@@ -13,7 +13,7 @@ import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 from flask import Flask, current_app
 
-from expenseai_ingest.config import IngestSettings
+from expenseai_ingest.config import IngestSettings, get_settings
 from expenseai_ingest import utils
 
 
@@ -85,23 +85,18 @@ class LocalStorageBackend(StorageBackend):
     def store_path(self, *, path: Path, original_name: Optional[str] = None, mime_type: Optional[str] = None) -> StorageResult:
         original = original_name or path.name
         relative_key, destination = self._destination(original)
-        digest = hashlib.sha256()
-        size = 0
-        with path.open("rb") as src, destination.open("wb") as dst:
-            while True:
-                chunk = src.read(1024 * 1024)
-                if not chunk:
-                    break
-                dst.write(chunk)
-                digest.update(chunk)
-                size += len(chunk)
+        # copyfile uses the kernel's zero-copy path where available; hashing the
+        # copy afterwards runs in C via file_digest rather than a Python loop.
+        shutil.copyfile(path, destination)
+        size = destination.stat().st_size
+        checksum = utils.compute_sha256_path(destination)
         return StorageResult(
             stored_filename=relative_key,
             original_filename=original,
             mime_type=mime_type or utils.guess_mime_from_name(original) or "application/octet-stream",
             filesize_bytes=size,
             source_path=relative_key,
-                checksum_sha256=digest.hexdigest(),
+            checksum_sha256=checksum,
             backend="local",
             uri=str(destination),
         )
@@ -155,21 +150,36 @@ class S3StorageBackend(StorageBackend):
         )
 
     def store_path(self, *, path: Path, original_name: Optional[str] = None, mime_type: Optional[str] = None) -> StorageResult:
-        data = path.read_bytes()
-        return self.store_bytes(
-            data=data,
-            original_name=original_name or path.name,
-            mime_type=mime_type or utils.guess_mime_from_name(path.name) or "application/octet-stream",
+        original = original_name or path.name
+        content_type = mime_type or utils.guess_mime_from_name(original) or "application/octet-stream"
+        key = self._object_key(original)
+        checksum = utils.compute_sha256_path(path)
+        size = path.stat().st_size
+        with path.open("rb") as src:
+            try:
+                # upload_fileobj streams in multipart chunks rather than one in-memory body.
+                self.client.upload_fileobj(src, self.bucket, key, ExtraArgs={"ContentType": content_type})
+            except (ClientError, BotoCoreError) as exc:  # pragma: no cover - requires AWS
+                raise StorageError(f"Failed to upload to S3: {exc}") from exc
+        return StorageResult(
+            stored_filename=key,
+            original_filename=original,
+            mime_type=content_type,
+            filesize_bytes=size,
+            source_path=key,
+            checksum_sha256=checksum,
+            backend="s3",
+            uri=f"s3://{self.bucket}/{key}",
         )
 
 
 def get_storage(app: Flask | None = None) -> StorageBackend:
     app = app or current_app
-    settings = IngestSettings.from_app(app)
     cache = app.extensions.setdefault("expenseai_ingest", {})
     backend = cache.get("storage_backend")
     if backend:
         return backend
+    settings = get_settings(app)
     if settings.storage.backend == "s3":
         backend = S3StorageBackend(app, settings)
     else:
@@ -7,14 +7,31 @@ persisted in the database and avoid any LLM heuristics.
 
 from __future__ import annotations
 
+import hashlib
 import json
 import re
+import time
+from dataclasses import dataclass
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
 
+from flask import current_app, g, has_request_context
+from sqlalchemy import Text, and_, bindparam, event, exists, func, or_, select
+from sqlalchemy.dialects.postgresql import array as pg_array
+from sqlalchemy.orm import Session, selectinload
 
+from expenseai_ext import cache
+from expenseai_ext.db import db, dialect_name
+from expenseai_models.extracted_field import ExtractedField
 from expenseai_models.invoice import Invoice
+from expenseai_models.line_item import LineItem
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
 
 DATE_FORMATS: Tuple[str, ...] = (
     "%Y-%m-%d",
@@ -28,6 +45,17 @@ DATE_FORMATS: Tuple[str, ...] = (
     "%B %d, %Y",
 )
 
+# The numeric DATE_FORMATS layouts are matched with one regex and built directly;
+# only the month-name layouts still go through strptime.
+_NUMERIC_DATE_RE = re.compile(r"(\d{4})([-/])(\d{1,2})\2(\d{1,2})|(\d{1,2})([-/.])(\d{1,2})\6(\d{4})")
+_TEXT_DATE_FORMATS: Tuple[str, ...] = tuple(fmt for fmt in DATE_FORMATS if "%b" in fmt or "%B" in fmt)
+
+_NON_ALNUM_RE = re.compile(r"[^A-Z0-9]")
+# str.translate table deleting every ASCII character outside [A-Z0-9].
+_NON_ALNUM_ASCII = {code: None for code in range(128) if not (48 <= code <= 57 or 65 <= code <= 90)}
+_WHITESPACE_RE = re.compile(r"\s+")
+_PO_SPLIT_RE = re.compile(r"[;,]")
+
 
 def _first_not_none(*values: Any) -> Any:
     for value in values:
@@ -49,18 +77,38 @@ def _normalise_text(value: Any, *, upper: bool = False, lower: bool = False) ->
     return text
 
 
+def _strip_non_alnum(text: str) -> str:
+    if text.isascii():
+        return text.translate(_NON_ALNUM_ASCII)
+    return _NON_ALNUM_RE.sub("", text)
+
+
 def _normalise_invoice_number(value: Any) -> Optional[str]:
     text = _normalise_text(value, upper=True)
     if not text:
         return None
-    return re.sub(r"[^A-Z0-9]", "", text)
+    return _strip_non_alnum(text)
 
 
 def _normalise_gstin(value: Any) -> Optional[str]:
     text = _normalise_text(value, upper=True)
     if not text:
         return None
-    return re.sub(r"\s+", "", text)
+    return _WHITESPACE_RE.sub("", text)
+
+
+def _parse_numeric_date(text: str) -> Optional[date]:
+    match = _NUMERIC_DATE_RE.fullmatch(text)
+    if match is None:
+        return None
+    if match.group(1):
+        year, month, day = match.group(1, 3, 4)
+    else:
+        day, month, year = match.group(5, 7, 8)
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
 
 
 def _normalise_date(value: Any) -> Optional[str]:
@@ -71,7 +119,10 @@ def _normalise_date(value: Any) -> Optional[str]:
     text = _normalise_text(value)
     if not text:
         return None
-    for fmt in DATE_FORMATS:
+    parsed = _parse_numeric_date(text)
+    if parsed is not None:
+        return parsed.isoformat()
+    for fmt in _TEXT_DATE_FORMATS:
         try:
             return datetime.strptime(text, fmt).date().isoformat()
         except ValueError:
@@ -132,7 +183,7 @@ def _normalise_po_numbers(values: Any) -> Tuple[Set[str], Dict[str, str], List[s
         return normals, mapping, display
     candidate = _maybe_json_decode(values)
     if isinstance(candidate, str):
-        parts: Iterable[Any] = re.split(r"[;,]", candidate)
+        parts: Iterable[Any] = _PO_SPLIT_RE.split(candidate)
     elif isinstance(candidate, Sequence) and not isinstance(candidate, (bytes, bytearray)):
         parts = candidate
     else:
@@ -144,7 +195,7 @@ def _normalise_po_numbers(values: Any) -> Tuple[Set[str], Dict[str, str], List[s
         if not text:
             continue
         display.append(text)
-        normalised = re.sub(r"[^A-Z0-9]", "", text.upper())
+        normalised = _strip_non_alnum(text.upper())
         if not normalised:
             continue
         normals.add(normalised)
@@ -152,7 +203,7 @@ def _normalise_po_numbers(values: Any) -> Tuple[Set[str], Dict[str, str], List[s
     return normals, mapping, display
 
 
-def _canonical_line_items(invoice: Invoice) -> Tuple[Optional[str], int]:
+def _canonical_line_items(invoice: Invoice) -> Tuple[Optional[bytes], int]:
     normalised: List[Dict[str, Optional[str]]] = []
     for item in getattr(invoice, "line_items", []) or []:
         normalised.append(
@@ -179,7 +230,13 @@ def _canonical_line_items(invoice: Invoice) -> Tuple[Optional[str], int]:
             entry["sku"],
         )
     )
-    return json.dumps(normalised, sort_keys=True, ensure_ascii=False), len(normalised)
+    # both encoders must yield identical bytes: the digest is stored and matched
+    if orjson is not None:
+        blob = orjson.dumps(normalised, option=orjson.OPT_SORT_KEYS)
+    else:
+        blob = json.dumps(normalised, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    # Signatures are only compared for equality, so keep a 16-byte digest per snapshot.
+    return hashlib.blake2b(blob, digest_size=16).digest(), len(normalised)
 
 
 def _to_checked_values(values: Dict[str, Any]) -> Dict[str, Optional[str]]:
@@ -206,6 +263,17 @@ def _display_value(value: Any) -> str:
     return text or "N/A"
 
 
+# Extracted-field names to try for each snapshot attribute, already lowercased to
+# match the keys produced by ``_field_lookup``.
+_FIELDS_INVOICE_NUMBER: Tuple[str, ...] = ("invoice_number", "invoice_no", "number")
+_FIELDS_VENDOR_GSTIN: Tuple[str, ...] = ("vendor_gstin", "gstin", "supplier_gstin")
+_FIELDS_INVOICE_AMOUNT: Tuple[str, ...] = ("invoice_amount", "total_amount", "grand_total")
+_FIELDS_INVOICE_DATE: Tuple[str, ...] = ("invoice_date", "date")
+_FIELDS_PO_NUMBERS: Tuple[str, ...] = ("purchase_order_numbers", "po_numbers")
+_FIELDS_PO_NUMBER: Tuple[str, ...] = ("po_number", "purchase_order_number", "po")
+_FIELDS_VENDOR_NAME: Tuple[str, ...] = ("vendor_name", "supplier_name", "seller_name")
+
+
 def _field_lookup(invoice: Invoice) -> Dict[str, Any]:
     lookup: Dict[str, Any] = {}
     for field in getattr(invoice, "extracted_fields", []) or []:
@@ -218,379 +286,740 @@ def _field_lookup(invoice: Invoice) -> Dict[str, Any]:
     return lookup
 
 
-def _extract_value(lookup: Dict[str, Any], *candidates: str) -> Any:
+def _extract_value(lookup: Dict[str, Any], candidates: Tuple[str, ...]) -> Any:
     for key in candidates:
-        value = lookup.get(key.lower())
+        value = lookup.get(key)
         if value not in (None, ""):
             return value
     return None
 
 
-def _build_snapshot(invoice: Invoice) -> Dict[str, Any]:
+@dataclass(frozen=True, slots=True)
+class CandidateSnapshot:
+    """Normalised duplicate-detection view of one invoice."""
+
+    id: int
+    invoice_number_norm: Optional[str]
+    invoice_number_display: Any
+    vendor_gstin_norm: Optional[str]
+    vendor_gstin_display: Any
+    invoice_amount: Optional[Decimal]
+    invoice_amount_display: Optional[str]
+    invoice_date_norm: Optional[str]
+    invoice_date_display: Any
+    po_numbers_norm: FrozenSet[str]
+    po_numbers_map: Mapping[str, str]
+    po_numbers_display: List[str]
+    line_signature: Optional[bytes]
+    line_item_count: int
+    created_at: Optional[str]
+    status: Optional[str]
+    vendor_name: Any
+    checksum: Optional[str] = None
+    duplicate_flag: bool = False
+
+
+def _created_at_display(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() + "Z" if value else None
+
+
+def _build_snapshot(invoice: Invoice) -> CandidateSnapshot:
     lookup = _field_lookup(invoice)
     invoice_number_raw = _first_not_none(
         invoice.invoice_no,
-        _extract_value(lookup, "invoice_number", "invoice_no", "number"),
+        _extract_value(lookup, _FIELDS_INVOICE_NUMBER),
     )
     vendor_gstin_raw = _first_not_none(
         invoice.vendor_gst,
-        _extract_value(lookup, "vendor_gstin", "gstin", "supplier_gstin"),
+        _extract_value(lookup, _FIELDS_VENDOR_GSTIN),
     )
     invoice_amount_raw = _first_not_none(
         invoice.grand_total,
         invoice.subtotal,
-        _extract_value(lookup, "invoice_amount", "total_amount", "grand_total"),
+        _extract_value(lookup, _FIELDS_INVOICE_AMOUNT),
     )
     invoice_date_raw = _first_not_none(
         invoice.invoice_date,
-        _extract_value(lookup, "invoice_date", "date"),
+        _extract_value(lookup, _FIELDS_INVOICE_DATE),
     )
     po_raw = _first_not_none(
-        _extract_value(lookup, "purchase_order_numbers", "po_numbers"),
-        _extract_value(lookup, "po_number", "purchase_order_number", "po"),
+        _extract_value(lookup, _FIELDS_PO_NUMBERS),
+        _extract_value(lookup, _FIELDS_PO_NUMBER),
     )
     vendor_name_raw = _first_not_none(
-        _extract_value(lookup, "vendor_name", "supplier_name", "seller_name"),
+        _extract_value(lookup, _FIELDS_VENDOR_NAME),
     )
     line_signature, line_count = _canonical_line_items(invoice)
     po_normals, po_map, po_display = _normalise_po_numbers(po_raw)
     invoice_amount = _to_decimal(invoice_amount_raw)
+    return CandidateSnapshot(
+        id=invoice.id,
+        invoice_number_norm=_normalise_invoice_number(invoice_number_raw),
+        invoice_number_display=invoice_number_raw,
+        vendor_gstin_norm=_normalise_gstin(vendor_gstin_raw),
+        vendor_gstin_display=vendor_gstin_raw,
+        invoice_amount=invoice_amount,
+        invoice_amount_display=_decimal_to_display(invoice_amount),
+        invoice_date_norm=_normalise_date(invoice_date_raw),
+        invoice_date_display=invoice_date_raw,
+        po_numbers_norm=frozenset(po_normals),
+        po_numbers_map=po_map,
+        po_numbers_display=po_display,
+        line_signature=line_signature,
+        line_item_count=line_count,
+        checksum=None,
+        created_at=_created_at_display(invoice.created_at),
+        status=invoice.processing_status,
+        vendor_name=vendor_name_raw,
+        duplicate_flag=False,
+    )
+
+
+# Bump when the stored snapshot layout or its normalisation rules change.
+_SNAPSHOT_VERSION = 2
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _snapshot_to_json(snapshot: CandidateSnapshot) -> Dict[str, Any]:
+    """Return the row-independent part of a snapshot in JSON-safe form."""
+    amount = snapshot.invoice_amount
+    signature = snapshot.line_signature
     return {
-        "id": invoice.id,
-        "invoice": invoice,
-        "invoice_number_norm": _normalise_invoice_number(invoice_number_raw),
-        "invoice_number_display": invoice_number_raw,
-        "vendor_gstin_norm": _normalise_gstin(vendor_gstin_raw),
-        "vendor_gstin_display": vendor_gstin_raw,
-        "invoice_amount": invoice_amount,
-        "invoice_amount_display": _decimal_to_display(invoice_amount),
-        "invoice_date_norm": _normalise_date(invoice_date_raw),
-        "invoice_date_display": invoice_date_raw,
-        "po_numbers_norm": po_normals,
-        "po_numbers_map": po_map,
-        "po_numbers_display": po_display,
-        "line_signature": line_signature,
-        "line_item_count": line_count,
-        "checksum": None,
-        "created_at": invoice.created_at.isoformat() + "Z" if invoice.created_at else None,
-        "status": invoice.processing_status,
-        "vendor_name": vendor_name_raw,
-        "duplicate_flag": False,
+        "version": _SNAPSHOT_VERSION,
+        "invoice_number_norm": snapshot.invoice_number_norm,
+        "invoice_number_display": _json_value(snapshot.invoice_number_display),
+        "vendor_gstin_norm": snapshot.vendor_gstin_norm,
+        "vendor_gstin_display": _json_value(snapshot.vendor_gstin_display),
+        "invoice_amount": str(amount) if amount is not None else None,
+        "invoice_date_norm": snapshot.invoice_date_norm,
+        "invoice_date_display": _json_value(snapshot.invoice_date_display),
+        "po_numbers_norm": sorted(snapshot.po_numbers_norm or ()),
+        "po_numbers_map": snapshot.po_numbers_map or {},
+        "po_numbers_display": snapshot.po_numbers_display or [],
+        "line_signature": signature.hex() if signature else None,
+        "line_item_count": snapshot.line_item_count,
+        "vendor_name": _json_value(snapshot.vendor_name),
     }
 
 
-def _serialize_candidate(snapshot: Dict[str, Any]) -> Dict[str, Any]:
-    def _serialise_value(value: Any) -> Any:
-        if isinstance(value, datetime):
-            return value.isoformat() + ("Z" if value.tzinfo is None else "")
-        if isinstance(value, date):
-            return value.isoformat()
-        if isinstance(value, Decimal):
-            return _decimal_to_display(value)
-        return value
+def _snapshot_from_json(
+    data: Dict[str, Any],
+    *,
+    invoice_id: int,
+    created_at: Optional[str],
+    status: Optional[str],
+) -> CandidateSnapshot:
+    amount = Decimal(data["invoice_amount"]) if data.get("invoice_amount") is not None else None
+    signature = data.get("line_signature")
+    return CandidateSnapshot(
+        id=invoice_id,
+        invoice_number_norm=data.get("invoice_number_norm"),
+        invoice_number_display=data.get("invoice_number_display"),
+        vendor_gstin_norm=data.get("vendor_gstin_norm"),
+        vendor_gstin_display=data.get("vendor_gstin_display"),
+        invoice_amount=amount,
+        invoice_amount_display=_decimal_to_display(amount),
+        invoice_date_norm=data.get("invoice_date_norm"),
+        invoice_date_display=data.get("invoice_date_display"),
+        po_numbers_norm=frozenset(data.get("po_numbers_norm") or ()),
+        po_numbers_map=data.get("po_numbers_map") or {},
+        po_numbers_display=data.get("po_numbers_display") or [],
+        line_signature=bytes.fromhex(signature) if signature else None,
+        line_item_count=data.get("line_item_count", 0),
+        checksum=None,
+        created_at=created_at,
+        status=status,
+        vendor_name=data.get("vendor_name"),
+        duplicate_flag=False,
+    )
+
+
+def _store_snapshot(invoice: Invoice, snapshot: CandidateSnapshot) -> None:
+    invoice.duplicate_snapshot = _snapshot_to_json(snapshot)
+    invoice.line_signature = snapshot.line_signature.hex() if snapshot.line_signature else None
+    invoice.po_numbers_norm = sorted(snapshot.po_numbers_norm) or None
+
+
+def _candidate_snapshots(rows: Sequence[Any]) -> List[CandidateSnapshot]:
+    """Hydrate snapshots from ``_snapshot_columns`` rows, rebuilding stale ones.
+
+    Current snapshots are read straight from the row tuples. Only invoices
+    whose stored snapshot is missing or outdated are loaded as entities and
+    rebuilt in memory; nothing is written back, as this runs inside read-only
+    requests. Stored snapshots are refreshed on the write path and by
+    ``backfill_duplicate_snapshots``.
+    """
+    hydrated: Dict[int, CandidateSnapshot] = {}
+    stale_ids: List[int] = []
+    for invoice_id, created_at, status, data in rows:
+        if (data or {}).get("version") != _SNAPSHOT_VERSION:
+            stale_ids.append(invoice_id)
+            continue
+        hydrated[invoice_id] = _snapshot_from_json(
+            data,
+            invoice_id=invoice_id,
+            created_at=_created_at_display(created_at),
+            status=status,
+        )
+    if stale_ids:
+        # load the collections for all stale rows in two IN queries
+        stale = Invoice.query.filter(Invoice.id.in_(stale_ids)).options(
+            selectinload(Invoice.line_items), selectinload(Invoice.extracted_fields)
+        )
+        for invoice in stale:
+            hydrated[invoice.id] = _build_snapshot(invoice)
+    return [hydrated[row[0]] for row in rows if row[0] in hydrated]
+
+
+def _target_snapshot(invoice: Invoice) -> CandidateSnapshot:
+    """Build the target snapshot once per request; ``g`` is dropped at teardown."""
+    if not has_request_context():
+        return _build_snapshot(invoice)
+    memo: Dict[int, CandidateSnapshot] = g.setdefault("duplicate_target_snapshots", {})
+    snapshot = memo.get(invoice.id)
+    if snapshot is None:
+        snapshot = memo[invoice.id] = _build_snapshot(invoice)
+    return snapshot
+
+
+def refresh_duplicate_snapshot(invoice: Invoice) -> None:
+    """Rebuild and store the invoice's snapshot after its duplicate fields change.
+
+    Called on the write path; the snapshot persists with the caller's commit.
+    Pending rows are flushed and the collections reloaded first, so line items
+    and extracted fields replaced through bulk deletes are read as stored.
+    """
+    db.session.flush()
+    db.session.expire(invoice, ["line_items", "extracted_fields"])
+    _store_snapshot(invoice, _build_snapshot(invoice))
+    if has_request_context():
+        g.get("duplicate_target_snapshots", {}).pop(invoice.id, None)
+    # the organisation's cached candidate lists are retired once this commits
+    db.session.info.setdefault(_PENDING_GENERATIONS, set()).add(invoice.organization_id)
+
+
+def backfill_duplicate_snapshots(batch_size: int = 200) -> int:
+    """Store snapshots for invoices whose snapshot is missing or outdated.
+
+    Commits after every batch and returns the number of invoices updated.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        batch = (
+            Invoice.query.filter(Invoice.id > last_id)
+            .order_by(Invoice.id.asc())
+            .options(selectinload(Invoice.line_items), selectinload(Invoice.extracted_fields))
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            return updated
+        for invoice in batch:
+            if (invoice.duplicate_snapshot or {}).get("version") != _SNAPSHOT_VERSION:
+                _store_snapshot(invoice, _build_snapshot(invoice))
+                updated += 1
+        last_id = batch[-1].id
+        db.session.commit()
+
+
+# Exact-type dispatch for the display values carried by snapshots; anything
+# else (mostly strings from extracted fields) passes through unchanged.
+_DISPLAY_SERIALISERS: Dict[type, Any] = {
+    datetime: lambda value: value.isoformat() + ("Z" if value.tzinfo is None else ""),
+    date: date.isoformat,
+    Decimal: _decimal_to_display,
+}
 
+
+def _serialise_value(value: Any) -> Any:
+    serialiser = _DISPLAY_SERIALISERS.get(type(value))
+    return serialiser(value) if serialiser is not None else value
+
+
+def _serialize_candidate(snapshot: CandidateSnapshot) -> Dict[str, Any]:
     return {
-        "invoice_id": snapshot["id"],
-        "invoice_number": _serialise_value(snapshot.get("invoice_number_display")),
-        "invoice_date": _serialise_value(snapshot.get("invoice_date_display")),
-        "invoice_amount": _serialise_value(snapshot.get("invoice_amount_display")),
-        "vendor_name": _serialise_value(snapshot.get("vendor_name")),
-        "vendor_gstin": _serialise_value(snapshot.get("vendor_gstin_display")),
-        "po_numbers": snapshot.get("po_numbers_display"),
-        "line_item_count": snapshot.get("line_item_count"),
-        "checksum": snapshot.get("checksum"),
-        "created_at": snapshot.get("created_at"),
-        "status": snapshot.get("status"),
-        "duplicate_flag": snapshot.get("duplicate_flag"),
+        "invoice_id": snapshot.id,
+        "invoice_number": _serialise_value(snapshot.invoice_number_display),
+        "invoice_date": _serialise_value(snapshot.invoice_date_display),
+        "invoice_amount": _serialise_value(snapshot.invoice_amount_display),
+        "vendor_name": _serialise_value(snapshot.vendor_name),
+        "vendor_gstin": _serialise_value(snapshot.vendor_gstin_display),
+        "po_numbers": snapshot.po_numbers_display,
+        "line_item_count": snapshot.line_item_count,
+        "checksum": snapshot.checksum,
+        "created_at": snapshot.created_at,
+        "status": snapshot.status,
+        "duplicate_flag": snapshot.duplicate_flag,
     }
 
 
-def _load_candidate_snapshots(target_invoice: Invoice) -> List[Dict[str, Any]]:
-    query = Invoice.query.filter(Invoice.id != target_invoice.id).order_by(Invoice.created_at.desc())
-    if target_invoice.organization_id is not None:
-        query = query.filter(Invoice.organization_id == target_invoice.organization_id)
-    else:
-        query = query.filter(Invoice.organization_id.is_(None))
-    # cap the search space to keep the query bounded
-    candidates = query.limit(250).all()
-    return [_build_snapshot(candidate) for candidate in candidates]
+def _normalised_gstin_sql(column: Any) -> Any:
+    """SQL mirror of ``_normalise_gstin`` for the vendor GSTIN column."""
+    for char in (" ", "\t", "\r", "\n"):
+        column = func.replace(column, char, "")
+    return func.upper(column)
 
 
-def run_manual_duplicate_checks(invoice: Invoice) -> Dict[str, Any]:
-    """Evaluate deterministic duplicate rules for the supplied invoice."""
-    if not isinstance(invoice, Invoice):
-        raise TypeError("invoice must be an Invoice model instance")
+# Most recent invoices a duplicate check considers per organisation.
+CANDIDATE_LIMIT = 250
 
-    snapshot = _build_snapshot(invoice)
-    candidate_snapshots = _load_candidate_snapshots(invoice)
-    checks: List[Dict[str, Any]] = []
 
-    def add_check(rule: str, title: str, status: str, reason: str, matches: List[Dict[str, Any]], values: Dict[str, Any]) -> None:
-        checks.append(
-            {
-                "rule": rule,
-                "title": title,
-                "status": status,
-                "reason": reason,
-                "matches": matches,
-                "checked_values": _to_checked_values(values),
-            }
-        )
+def _snapshot_columns() -> Tuple[Any, ...]:
+    """Columns, in ``_candidate_snapshots`` order, needed to hydrate a stored snapshot."""
+    return (Invoice.id, Invoice.created_at, Invoice.processing_status, Invoice.duplicate_snapshot)
+
+
+@lru_cache(maxsize=8)
+def _candidate_statement(vendor_rule: bool, lines_rule: bool, org_scoped: bool) -> Any:
+    """Build the candidate pre-filter once per rule combination.
 
-    invoice_number_norm = snapshot.get("invoice_number_norm")
-    vendor_gstin_norm = snapshot.get("vendor_gstin_norm")
-    if invoice_number_norm and vendor_gstin_norm:
-        matches = []
-        for cand in candidate_snapshots:
-            if cand.get("invoice_number_norm") == invoice_number_norm and cand.get("vendor_gstin_norm") == vendor_gstin_norm:
-                matches.append(_serialize_candidate(cand))
-        if matches:
-            reason = "Invoice number {} with vendor GSTIN {} matches invoice(s): {}.".format(
-                _display_value(snapshot.get("invoice_number_display") or invoice_number_norm),
-                _display_value(snapshot.get("vendor_gstin_display") or vendor_gstin_norm),
-                ", ".join(f"#{m['invoice_id']}" for m in matches),
+    Target values are bound parameters, so each shape is constructed and
+    compiled once and then reused from SQLAlchemy's statement cache.
+    Snapshot values may come from extracted fields rather than invoice columns,
+    so the predicates only reject rows whose own columns rule them out.
+    """
+    predicates: List[Any] = []
+    if vendor_rule:
+        # every GSTIN-scoped rule needs the vendors to agree; a NULL column
+        # falls back to the extracted field, which is only known after loading
+        predicates.append(
+            or_(
+                Invoice.vendor_gst.is_(None),
+                _normalised_gstin_sql(Invoice.vendor_gst) == bindparam("vendor_gstin_norm"),
             )
-            status = "duplicate"
-        else:
-            reason = "No other invoice for GSTIN {} uses invoice number {}.".format(
-                _display_value(snapshot.get("vendor_gstin_display") or vendor_gstin_norm),
-                _display_value(snapshot.get("invoice_number_display") or invoice_number_norm),
+        )
+    if lines_rule:
+        line_count = (
+            select(func.count(LineItem.id))
+            .where(LineItem.invoice_id == Invoice.id)
+            .scalar_subquery()
+        )
+        has_po_field = exists().where(
+            ExtractedField.invoice_id == Invoice.id,
+            func.lower(func.trim(ExtractedField.field_name)).in_(_FIELDS_PO_NUMBERS + _FIELDS_PO_NUMBER),
+        )
+        # rows with a stored signature match on it directly; the rest are
+        # narrowed to the same line count and a PO field before hashing
+        predicates.append(
+            or_(
+                Invoice.line_signature == bindparam("line_signature"),
+                and_(
+                    Invoice.line_signature.is_(None),
+                    line_count == bindparam("line_item_count"),
+                    has_po_field,
+                ),
             )
-            status = "unique"
-        add_check(
-            "invoice_number_vendor_gstin",
-            "Invoice Number + Vendor GSTIN",
-            status,
-            reason,
-            matches,
-            {
-                "invoice_number": snapshot.get("invoice_number_display") or invoice_number_norm,
-                "vendor_gstin": snapshot.get("vendor_gstin_display") or vendor_gstin_norm,
-            },
         )
-    else:
-        reason = "Missing invoice number or vendor GSTIN on this invoice; cannot evaluate uniqueness."
-        add_check(
-            "invoice_number_vendor_gstin",
-            "Invoice Number + Vendor GSTIN",
-            "insufficient_data",
-            reason,
-            [],
-            {
-                "invoice_number": snapshot.get("invoice_number_display"),
-                "vendor_gstin": snapshot.get("vendor_gstin_display"),
-            },
+    org_clause = (
+        Invoice.organization_id == bindparam("organization_id")
+        if org_scoped
+        else Invoice.organization_id.is_(None)
+    )
+    # cap the search space to keep the query bounded
+    return (
+        select(*_snapshot_columns())
+        .where(Invoice.id != bindparam("target_id"), org_clause, or_(*predicates))
+        .order_by(Invoice.created_at.desc())
+        .limit(CANDIDATE_LIMIT)
+    )
+
+
+def _scoped_candidates(target_invoice: Invoice) -> Any:
+    query = Invoice.query.filter(Invoice.id != target_invoice.id)
+    if target_invoice.organization_id is not None:
+        return query.filter(Invoice.organization_id == target_invoice.organization_id)
+    return query.filter(Invoice.organization_id.is_(None))
+
+
+def _candidate_scope(target_invoice: Invoice) -> Tuple[int, Optional[int]]:
+    """Return ``(candidate_count, latest_id)`` for the target's organisation.
+
+    ``candidate_count`` keeps its meaning from before the SQL pre-filter: the
+    number of other invoices in scope, capped at ``CANDIDATE_LIMIT``, even
+    though only plausible matches are loaded now.
+    """
+    total, latest_id = (
+        _scoped_candidates(target_invoice).with_entities(func.count(Invoice.id), func.max(Invoice.id)).one()
+    )
+    return min(total, CANDIDATE_LIMIT), latest_id
+
+
+def _load_candidate_snapshots(target_invoice: Invoice, snapshot: CandidateSnapshot) -> List[CandidateSnapshot]:
+    vendor_rule = bool(
+        snapshot.vendor_gstin_norm
+        and (
+            snapshot.invoice_number_norm
+            or (snapshot.invoice_amount is not None and snapshot.invoice_date_norm)
+            or snapshot.po_numbers_norm
         )
+    )
+    lines_rule = bool(snapshot.line_signature and snapshot.po_numbers_norm)
+    if not (vendor_rule or lines_rule):
+        return []
+    org_scoped = target_invoice.organization_id is not None
+    params: Dict[str, Any] = {"target_id": target_invoice.id}
+    if org_scoped:
+        params["organization_id"] = target_invoice.organization_id
+    if vendor_rule:
+        params["vendor_gstin_norm"] = snapshot.vendor_gstin_norm
+    if lines_rule:
+        params["line_signature"] = snapshot.line_signature.hex()
+        params["line_item_count"] = snapshot.line_item_count
+    statement = _candidate_statement(vendor_rule, lines_rule, org_scoped)
+    return _candidate_snapshots(db.session.execute(statement, params).all())
+
+
+def _load_exact_match_snapshots(
+    target_invoice: Invoice,
+    snapshot: CandidateSnapshot,
+    seen_ids: Set[int],
+) -> List[CandidateSnapshot]:
+    """Snapshot invoices matching the target on indexed exact-equality columns.
 
-    invoice_amount = snapshot.get("invoice_amount")
-    invoice_date_norm = snapshot.get("invoice_date_norm")
-    if invoice_amount is not None and invoice_date_norm and vendor_gstin_norm:
-        matches = []
-        for cand in candidate_snapshots:
-            if cand.get("vendor_gstin_norm") != vendor_gstin_norm:
-                continue
-            if cand.get("invoice_amount") is None or cand.get("invoice_date_norm") is None:
-                continue
-            if cand.get("invoice_amount") == invoice_amount and cand.get("invoice_date_norm") == invoice_date_norm:
-                matches.append(_serialize_candidate(cand))
-        if matches:
-            reason = "Invoice amount {} with date {} for GSTIN {} matches invoice(s): {}.".format(
-                _display_value(snapshot.get("invoice_amount_display") or invoice_amount),
-                _display_value(snapshot.get("invoice_date_display") or invoice_date_norm),
-                _display_value(snapshot.get("vendor_gstin_display") or vendor_gstin_norm),
-                ", ".join(f"#{m['invoice_id']}" for m in matches),
+    Stored GSTIN + invoice number use the (organization_id, vendor_gst,
+    invoice_no) index, the persisted line signature uses
+    (organization_id, line_signature) and, on PostgreSQL, PO overlap uses
+    the GIN index on po_numbers_norm, so these duplicates are found even
+    when they fall outside the candidate cap.
+    """
+    predicates: List[Any] = []
+    if target_invoice.vendor_gst and target_invoice.invoice_no:
+        predicates.append(
+            and_(
+                Invoice.vendor_gst == target_invoice.vendor_gst,
+                Invoice.invoice_no == target_invoice.invoice_no,
             )
-            status = "duplicate"
-        else:
-            reason = "No other invoice for GSTIN {} matches amount {} and date {}.".format(
-                _display_value(snapshot.get("vendor_gstin_display") or vendor_gstin_norm),
-                _display_value(snapshot.get("invoice_amount_display") or invoice_amount),
-                _display_value(snapshot.get("invoice_date_display") or invoice_date_norm),
+        )
+    if snapshot.line_signature and snapshot.po_numbers_norm:
+        predicates.append(Invoice.line_signature == snapshot.line_signature.hex())
+    if snapshot.vendor_gstin_norm and snapshot.po_numbers_norm and dialect_name() == "postgresql":
+        # GIN-indexed array overlap; the PO rule still confirms and labels the hits
+        predicates.append(
+            and_(
+                Invoice.po_numbers_norm.op("&&")(pg_array(sorted(snapshot.po_numbers_norm), type_=Text)),
+                or_(
+                    Invoice.vendor_gst.is_(None),
+                    _normalised_gstin_sql(Invoice.vendor_gst) == snapshot.vendor_gstin_norm,
+                ),
             )
-            status = "unique"
-        add_check(
-            "invoice_amount_vendor_gstin_date",
-            "Invoice Amount + Vendor GSTIN + Date",
-            status,
-            reason,
-            matches,
-            {
-                "invoice_amount": snapshot.get("invoice_amount_display") or invoice_amount,
-                "invoice_date": snapshot.get("invoice_date_display") or invoice_date_norm,
-                "vendor_gstin": snapshot.get("vendor_gstin_display") or vendor_gstin_norm,
-            },
         )
+    if not predicates:
+        return []
+    rows = (
+        _scoped_candidates(target_invoice)
+        .with_entities(Invoice.id)
+        .filter(or_(*predicates))
+        .limit(20)
+        .all()
+    )
+    missing = [row.id for row in rows if row.id not in seen_ids]
+    if not missing:
+        return []
+    rows = db.session.execute(select(*_snapshot_columns()).where(Invoice.id.in_(missing))).all()
+    return _candidate_snapshots(rows)
+
+
+def _match_ids(matches: List[Dict[str, Any]]) -> str:
+    return ", ".join(f"#{m['invoice_id']}" for m in matches)
+
+
+def _overlap_label(matches: List[Dict[str, Any]]) -> str:
+    overlap = sorted(
+        {
+            po
+            for match in matches
+            for po in (match.get("overlap_po_numbers") or match.get("po_numbers") or [])
+        }
+    )
+    return ", ".join(overlap) or "listed PO"
+
+
+CANDIDATE_CACHE_PREFIX = "duplicate-candidates"
+# Session.info key collecting organisations whose generation bumps on commit.
+_PENDING_GENERATIONS = "duplicate_candidate_generations"
+# Flask-Caching backends that keep entries inside one process. Parsing runs in
+# a worker, whose bumps would never reach the web process, so candidate lists
+# are not cached on these.
+_PROCESS_LOCAL_CACHE_TYPES = frozenset({"simplecache", "simple", "nullcache", "null"})
+
+
+def _candidate_generation_key(organization_id: Optional[int]) -> str:
+    return f"{CANDIDATE_CACHE_PREFIX}:generation:{organization_id}"
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_candidate_generations(session: Session) -> None:
+    # after the commit, so a concurrent check cannot cache pre-commit rows
+    # under the new generation
+    for organization_id in session.info.pop(_PENDING_GENERATIONS, ()):
+        cache.inc(_candidate_generation_key(organization_id))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_candidate_generations(session: Session, previous_transaction: Any) -> None:
+    session.info.pop(_PENDING_GENERATIONS, None)
+
+
+def _candidate_cache_ttl() -> int:
+    backend = str(current_app.config.get("CACHE_TYPE") or "null").rsplit(".", 1)[-1].lower()
+    if backend in _PROCESS_LOCAL_CACHE_TYPES:
+        return 0
+    return current_app.config.get("DUPLICATE_CANDIDATE_CACHE_TTL_SECS", 60)
+
+
+def _load_all_candidates(target_invoice: Invoice, snapshot: CandidateSnapshot) -> List[CandidateSnapshot]:
+    candidates = _load_candidate_snapshots(target_invoice, snapshot)
+    candidates.extend(_load_exact_match_snapshots(target_invoice, snapshot, {cand.id for cand in candidates}))
+    return candidates
+
+
+def _cached_candidate_snapshots(
+    target_invoice: Invoice,
+    snapshot: CandidateSnapshot,
+    latest_id: Optional[int],
+) -> List[CandidateSnapshot]:
+    """Reuse the candidate list of a recent check on the same invoice.
+
+    The key carries the newest invoice id of the organisation, so uploads
+    start a new entry, and a generation counter that is bumped when a
+    ``refresh_duplicate_snapshot`` call commits. Only used with a cache
+    shared between processes.
+    """
+    ttl = _candidate_cache_ttl()
+    if not ttl:
+        return _load_all_candidates(target_invoice, snapshot)
+    organization_id = target_invoice.organization_id
+    generation = cache.get(_candidate_generation_key(organization_id)) or 0
+    key = f"{CANDIDATE_CACHE_PREFIX}:{organization_id}:{target_invoice.id}:{latest_id}:{generation}"
+    cached = cache.get(key)
+    if cached is not None:
+        return [
+            _snapshot_from_json(
+                entry,
+                invoice_id=entry["id"],
+                created_at=entry["created_at"],
+                status=entry["status"],
+            )
+            for entry in cached
+        ]
+    candidates = _load_all_candidates(target_invoice, snapshot)
+    cache.set(
+        key,
+        [
+            {**_snapshot_to_json(cand), "id": cand.id, "created_at": cand.created_at, "status": cand.status}
+            for cand in candidates
+        ],
+        timeout=ttl,
+    )
+    return candidates
+
+
+# (epoch second, ISO string) of the last evaluated_at stamp handed out
+_EVALUATED_AT_CACHE: List[Any] = [0, ""]
+
+
+def _evaluated_at() -> str:
+    """UTC timestamp at second resolution, formatted once per second."""
+    now = int(time.time())
+    if now != _EVALUATED_AT_CACHE[0]:
+        _EVALUATED_AT_CACHE[:] = [now, datetime.utcfromtimestamp(now).isoformat(timespec="seconds") + "Z"]
+    return _EVALUATED_AT_CACHE[1]
+
+
+def run_manual_duplicate_checks(invoice: Invoice) -> Dict[str, Any]:
+    """Evaluate deterministic duplicate rules for the supplied invoice."""
+    if not isinstance(invoice, Invoice):
+        raise TypeError("invoice must be an Invoice model instance")
+
+    snapshot = _target_snapshot(invoice)
+
+    invoice_number_norm = snapshot.invoice_number_norm
+    vendor_gstin_norm = snapshot.vendor_gstin_norm
+    invoice_amount = snapshot.invoice_amount
+    invoice_date_norm = snapshot.invoice_date_norm
+    po_numbers_norm = snapshot.po_numbers_norm
+    po_numbers_map: Dict[str, str] = snapshot.po_numbers_map
+    checksum = snapshot.checksum
+    line_signature = snapshot.line_signature
+
+    check_number = bool(invoice_number_norm and vendor_gstin_norm)
+    check_amount = invoice_amount is not None and bool(invoice_date_norm and vendor_gstin_norm)
+    check_po = bool(po_numbers_norm and vendor_gstin_norm)
+    check_lines = bool(line_signature and po_numbers_norm)
+    candidate_count, latest_id = _candidate_scope(invoice)
+    # unparsed invoices cannot satisfy any rule; report insufficient data without loading candidates
+    if check_number or check_amount or check_po or check_lines or checksum:
+        candidate_snapshots = _cached_candidate_snapshots(invoice, snapshot, latest_id)
     else:
-        reason = "Missing invoice amount, vendor GSTIN, or invoice date; cannot evaluate heuristic."
-        add_check(
+        candidate_snapshots = []
+
+    # a candidate matching several rules is serialised once; the PO rules
+    # copy the shared payload before adding their overlap list
+    serialised: Dict[int, Dict[str, Any]] = {}
+
+    def serialised_match(cand: CandidateSnapshot) -> Dict[str, Any]:
+        serial = serialised.get(cand.id)
+        if serial is None:
+            serial = serialised[cand.id] = _serialize_candidate(cand)
+        return serial
+
+    def overlap_match(cand: CandidateSnapshot, overlap: List[str]) -> Dict[str, Any]:
+        serial = dict(serialised_match(cand))
+        serial["overlap_po_numbers"] = [
+            cand.po_numbers_map.get(value, po_numbers_map.get(value, value)) for value in overlap
+        ]
+        return serial
+
+    # classify every candidate for all rules in one pass
+    number_matches: List[Dict[str, Any]] = []
+    amount_matches: List[Dict[str, Any]] = []
+    po_matches: List[Dict[str, Any]] = []
+    checksum_matches: List[Dict[str, Any]] = []
+    line_matches: List[Dict[str, Any]] = []
+    # three rules are scoped to the target GSTIN, so other vendors skip them with one comparison
+    check_vendor = check_number or check_amount or check_po
+    for cand in candidate_snapshots:
+        po_rule = False
+        if check_vendor and cand.vendor_gstin_norm == vendor_gstin_norm:
+            if check_number and cand.invoice_number_norm == invoice_number_norm:
+                number_matches.append(serialised_match(cand))
+            if (
+                check_amount
+                and cand.invoice_amount is not None
+                and cand.invoice_date_norm is not None
+                and cand.invoice_amount == invoice_amount
+                and cand.invoice_date_norm == invoice_date_norm
+            ):
+                amount_matches.append(serialised_match(cand))
+            po_rule = check_po
+        if checksum and cand.checksum == checksum:
+            checksum_matches.append(serialised_match(cand))
+        lines_rule = check_lines and cand.line_signature == line_signature
+        if not (po_rule or lines_rule):
+            continue
+        cand_po_norm = cand.po_numbers_norm
+        if not cand_po_norm or po_numbers_norm.isdisjoint(cand_po_norm):
+            continue
+        overlap = sorted(po_numbers_norm & cand_po_norm)
+        if po_rule:
+            po_matches.append(overlap_match(cand, overlap))
+        if lines_rule:
+            line_matches.append(overlap_match(cand, overlap))
+
+    number_display = snapshot.invoice_number_display or invoice_number_norm
+    gstin_display = snapshot.vendor_gstin_display or vendor_gstin_norm
+    amount_display = snapshot.invoice_amount_display or invoice_amount
+    date_display = snapshot.invoice_date_display or invoice_date_norm
+    po_display = " / ".join(snapshot.po_numbers_display) or None
+
+    # rule id, title, whether the target has the data, matches, duplicate
+    # reason (given matches), unique reason, missing-data reason, checked
+    # values when evaluated, checked values when data is missing
+    rules = (
+        (
+            "invoice_number_vendor_gstin",
+            "Invoice Number + Vendor GSTIN",
+            check_number,
+            number_matches,
+            lambda matches: "Invoice number {} with vendor GSTIN {} matches invoice(s): {}.".format(
+                _display_value(number_display), _display_value(gstin_display), _match_ids(matches)
+            ),
+            lambda: "No other invoice for GSTIN {} uses invoice number {}.".format(
+                _display_value(gstin_display), _display_value(number_display)
+            ),
+            "Missing invoice number or vendor GSTIN on this invoice; cannot evaluate uniqueness.",
+            {"invoice_number": number_display, "vendor_gstin": gstin_display},
+            {"invoice_number": snapshot.invoice_number_display, "vendor_gstin": snapshot.vendor_gstin_display},
+        ),
+        (
             "invoice_amount_vendor_gstin_date",
             "Invoice Amount + Vendor GSTIN + Date",
-            "insufficient_data",
-            reason,
-            [],
+            check_amount,
+            amount_matches,
+            lambda matches: "Invoice amount {} with date {} for GSTIN {} matches invoice(s): {}.".format(
+                _display_value(amount_display),
+                _display_value(date_display),
+                _display_value(gstin_display),
+                _match_ids(matches),
+            ),
+            lambda: "No other invoice for GSTIN {} matches amount {} and date {}.".format(
+                _display_value(gstin_display), _display_value(amount_display), _display_value(date_display)
+            ),
+            "Missing invoice amount, vendor GSTIN, or invoice date; cannot evaluate heuristic.",
+            {"invoice_amount": amount_display, "invoice_date": date_display, "vendor_gstin": gstin_display},
             {
-                "invoice_amount": snapshot.get("invoice_amount_display") or invoice_amount,
-                "invoice_date": snapshot.get("invoice_date_display") or invoice_date_norm,
-                "vendor_gstin": snapshot.get("vendor_gstin_display"),
+                "invoice_amount": amount_display,
+                "invoice_date": date_display,
+                "vendor_gstin": snapshot.vendor_gstin_display,
             },
-        )
-
-    po_numbers_norm: Set[str] = snapshot.get("po_numbers_norm", set())
-    if po_numbers_norm and vendor_gstin_norm:
-        matches = []
-        for cand in candidate_snapshots:
-            cand_po_norm: Set[str] = cand.get("po_numbers_norm", set())
-            if not cand_po_norm or cand.get("vendor_gstin_norm") != vendor_gstin_norm:
-                continue
-            overlap = sorted(po_numbers_norm & cand_po_norm)
-            if not overlap:
-                continue
-            serial = _serialize_candidate(cand)
-            serial["overlap_po_numbers"] = [
-                cand.get("po_numbers_map", {}).get(value, snapshot.get("po_numbers_map", {}).get(value, value))
-                for value in overlap
-            ]
-            matches.append(serial)
-        if matches:
-            overlap_display_list = sorted(
-                {
-                    po
-                    for match in matches
-                    for po in (match.get("overlap_po_numbers") or match.get("po_numbers") or [])
-                }
-            )
-            overlap_display = ", ".join(overlap_display_list) or "listed PO"
-            reason = "Purchase order number overlap ({}) detected in invoice(s): {}.".format(
-                overlap_display,
-                ", ".join(f"#{m['invoice_id']}" for m in matches),
-            )
-            status = "duplicate"
-        else:
-            reason = "No other invoice for GSTIN {} shares purchase order numbers {}.".format(
-                _display_value(snapshot.get("vendor_gstin_display") or vendor_gstin_norm),
-                _display_value(" / ".join(snapshot.get("po_numbers_display", [])) or None),
-            )
-            status = "unique"
-        add_check(
-            "po_number_vendor_gstin",
-            "PO Number + Vendor GSTIN",
-            status,
-            reason,
-            matches,
-            {
-                "purchase_order_numbers": snapshot.get("po_numbers_display"),
-                "vendor_gstin": snapshot.get("vendor_gstin_display") or vendor_gstin_norm,
-            },
-        )
-    else:
-        reason = "Missing purchase order numbers or vendor GSTIN; cannot evaluate PO overlap."
-        add_check(
+        ),
+        (
             "po_number_vendor_gstin",
             "PO Number + Vendor GSTIN",
-            "insufficient_data",
-            reason,
-            [],
-            {
-                "purchase_order_numbers": snapshot.get("po_numbers_display"),
-                "vendor_gstin": snapshot.get("vendor_gstin_display"),
-            },
-        )
-
-    checksum = snapshot.get("checksum")
-    if checksum:
-        checksum_matches = []
-        for cand in candidate_snapshots:
-            if cand.get("checksum") == checksum:
-                checksum_matches.append(_serialize_candidate(cand))
-        if checksum_matches:
-            reason = "File checksum {} already exists on invoice(s): {}.".format(
-                checksum,
-                ", ".join(f"#{m['invoice_id']}" for m in checksum_matches),
-            )
-            status = "duplicate"
-        else:
-            reason = "No stored invoice shares this file checksum."
-            status = "unique"
-        add_check(
+            check_po,
+            po_matches,
+            lambda matches: "Purchase order number overlap ({}) detected in invoice(s): {}.".format(
+                _overlap_label(matches), _match_ids(matches)
+            ),
+            lambda: "No other invoice for GSTIN {} shares purchase order numbers {}.".format(
+                _display_value(gstin_display), _display_value(po_display)
+            ),
+            "Missing purchase order numbers or vendor GSTIN; cannot evaluate PO overlap.",
+            {"purchase_order_numbers": snapshot.po_numbers_display, "vendor_gstin": gstin_display},
+            {"purchase_order_numbers": snapshot.po_numbers_display, "vendor_gstin": snapshot.vendor_gstin_display},
+        ),
+        (
             "file_hash",
             "File Hash",
-            status,
-            reason,
+            bool(checksum),
             checksum_matches,
-            {
-                "checksum": checksum,
-            },
-        )
-    else:
-        reason = "Checksum not recorded; exact file duplicate check unavailable."
-        add_check(
-            "file_hash",
-            "File Hash",
-            "insufficient_data",
-            reason,
-            [],
-            {
-                "checksum": None,
-            },
-        )
-
-    line_signature = snapshot.get("line_signature")
-    if line_signature and po_numbers_norm:
-        matches = []
-        for cand in candidate_snapshots:
-            if cand.get("line_signature") != line_signature:
-                continue
-            overlap = sorted(po_numbers_norm & cand.get("po_numbers_norm", set()))
-            if not overlap:
-                continue
-            serial = _serialize_candidate(cand)
-            serial["overlap_po_numbers"] = [
-                cand.get("po_numbers_map", {}).get(value, snapshot.get("po_numbers_map", {}).get(value, value))
-                for value in overlap
-            ]
-            matches.append(serial)
-        if matches:
-            overlap_display_list = sorted(
-                {
-                    po
-                    for match in matches
-                    for po in (match.get("overlap_po_numbers") or match.get("po_numbers") or [])
-                }
-            )
-            overlap_display = ", ".join(overlap_display_list) or "listed PO"
-            reason = "Identical line items under PO {} also present in invoice(s): {}.".format(
-                overlap_display,
-                ", ".join(f"#{m['invoice_id']}" for m in matches),
-            )
-            status = "duplicate"
-        else:
-            reason = "No invoices share identical line items with purchase order numbers {}.".format(
-                _display_value(" / ".join(snapshot.get("po_numbers_display", [])) or None),
-            )
-            status = "unique"
-        add_check(
-            "line_items_po_number",
-            "Line Items + PO Number",
-            status,
-            reason,
-            matches,
-            {
-                "purchase_order_numbers": snapshot.get("po_numbers_display"),
-                "line_item_count": snapshot.get("line_item_count"),
-            },
-        )
-    else:
-        reason = "Missing line items or purchase order numbers; cannot evaluate line-item overlap."
-        add_check(
+            lambda matches: "File checksum {} already exists on invoice(s): {}.".format(checksum, _match_ids(matches)),
+            lambda: "No stored invoice shares this file checksum.",
+            "Checksum not recorded; exact file duplicate check unavailable.",
+            {"checksum": checksum},
+            {"checksum": None},
+        ),
+        (
             "line_items_po_number",
             "Line Items + PO Number",
-            "insufficient_data",
-            reason,
-            [],
+            check_lines,
+            line_matches,
+            lambda matches: "Identical line items under PO {} also present in invoice(s): {}.".format(
+                _overlap_label(matches), _match_ids(matches)
+            ),
+            lambda: "No invoices share identical line items with purchase order numbers {}.".format(
+                _display_value(po_display)
+            ),
+            "Missing line items or purchase order numbers; cannot evaluate line-item overlap.",
+            {"purchase_order_numbers": snapshot.po_numbers_display, "line_item_count": snapshot.line_item_count},
+            {"purchase_order_numbers": snapshot.po_numbers_display, "line_item_count": snapshot.line_item_count},
+        ),
+    )
+    checks: List[Dict[str, Any]] = []
+    for rule, title, active, matches, duplicate_reason, unique_reason, missing_reason, values, missing_values in rules:
+        if not active:
+            status, reason, matches, values = "insufficient_data", missing_reason, [], missing_values
+        elif matches:
+            status, reason = "duplicate", duplicate_reason(matches)
+        else:
+            status, reason = "unique", unique_reason()
+        checks.append(
             {
-                "purchase_order_numbers": snapshot.get("po_numbers_display"),
-                "line_item_count": snapshot.get("line_item_count"),
-            },
+                "rule": rule,
+                "title": title,
+                "status": status,
+                "reason": reason,
+                "matches": matches,
+                "checked_values": _to_checked_values(values),
+            }
         )
 
     is_duplicate = any(check.get("status") == "duplicate" for check in checks)
@@ -598,7 +1027,7 @@ def run_manual_duplicate_checks(invoice: Invoice) -> Dict[str, Any]:
         "status": "success",
         "invoice_id": invoice.id,
         "is_duplicate": is_duplicate,
-        "candidate_count": len(candidate_snapshots),
+        "candidate_count": candidate_count,
         "checks": checks,
-        "evaluated_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "evaluated_at": _evaluated_at(),
     }
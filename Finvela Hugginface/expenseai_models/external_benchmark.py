@@ -17,6 +17,14 @@ class ExternalBenchmark(db.Model):
     __table_args__ = (
         Index("ix_external_benchmark_text", "text_norm"),
         Index("ix_external_benchmark_effective", "text_norm", "effective_from"),
+        Index(
+            "uq_external_benchmark_key",
+            "text_norm",
+            "currency",
+            "source",
+            "effective_from",
+            unique=True,
+        ),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -4,11 +4,15 @@ from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING, Any, Dict
 
-from sqlalchemy import BigInteger, Date, DateTime, Float, Index, Integer, Numeric, String, Text
+from sqlalchemy import JSON, BigInteger, Date, DateTime, Float, Index, Integer, Numeric, String, Text
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from expenseai_ext.db import db
 
+# Native text[] on PostgreSQL so PO overlap can use a GIN index; JSON elsewhere.
+StringListType = JSON().with_variant(ARRAY(Text), "postgresql")
+
 if TYPE_CHECKING:  # pragma: no cover - import only for type checking
     from expenseai_models.invoice_event import InvoiceEvent
     from expenseai_models.compliance_check import ComplianceCheck
@@ -34,6 +38,11 @@ class Invoice(db.Model):
     __tablename__ = "invoices"
     __table_args__ = (
         Index("ix_invoice_vendor_invoice", "vendor_gst", "invoice_no"),
+        Index("ix_invoice_org_created", "organization_id", "created_at"),
+        Index("ix_invoice_org_vendor_invoice", "organization_id", "vendor_gst", "invoice_no"),
+        Index("ix_invoice_org_line_signature", "organization_id", "line_signature"),
+        # GIN serves the PostgreSQL array-overlap (&&) lookup on normalised PO numbers.
+        Index("ix_invoice_po_numbers_norm_gin", "po_numbers_norm", postgresql_using="gin").ddl_if(dialect="postgresql"),
         Index("ix_invoice_created_at", "created_at"),
     )
 
@@ -62,6 +71,11 @@ class Invoice(db.Model):
     compliance_notes: Mapped[str | None] = mapped_column(Text, nullable=True)
     risk_status: Mapped[str] = mapped_column(String(32), nullable=False, default="PENDING")
     risk_notes: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Normalised duplicate-detection fields, rebuilt and stored by refresh_duplicate_snapshot after parsing or edits.
+    duplicate_snapshot: Mapped[Dict[str, Any] | None] = mapped_column(JSON, nullable=True)
+    # Hex digest of the canonical line items, kept alongside duplicate_snapshot for indexed lookups.
+    line_signature: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    po_numbers_norm: Mapped[list[str] | None] = mapped_column(StringListType, nullable=True)
     organization_id: Mapped[int | None] = mapped_column(Integer, db.ForeignKey("organizations.id"), nullable=True, index=True)
     organization: Mapped["Organization | None"] = relationship("Organization", back_populates="invoices")
     assignee_id: Mapped[int | None] = mapped_column(Integer, db.ForeignKey("users.id"), nullable=True, index=True)
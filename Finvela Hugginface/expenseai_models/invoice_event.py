@@ -27,11 +27,23 @@ class InvoiceEvent(db.Model):
     invoice: Mapped["Invoice"] = relationship("Invoice", back_populates="events")
 
     @classmethod
-    def record(cls, invoice: "Invoice", event_type: str, payload: Dict[str, Any] | None = None) -> "InvoiceEvent":
-        """Persist a new event for the given invoice."""
+    def record(
+        cls,
+        invoice: "Invoice",
+        event_type: str,
+        payload: Dict[str, Any] | None = None,
+        *,
+        flush: bool = True,
+    ) -> "InvoiceEvent":
+        """Persist a new event for the given invoice.
+
+        Pass ``flush=False`` when the caller commits right away and does not need
+        the event id, so the INSERT rides along with the commit's flush.
+        """
         event = cls(invoice=invoice, event_type=event_type, payload=payload or {})
         db.session.add(event)
-        db.session.flush()  # ensure event has an id for SSE before commit
+        if flush:
+            db.session.flush()  # ensure event has an id for SSE before commit
         return event
 
     def as_dict(self) -> Dict[str, Any]:
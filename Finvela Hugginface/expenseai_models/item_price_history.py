@@ -15,8 +15,17 @@ class ItemPriceHistory(db.Model):
 
     __tablename__ = "item_price_history"
     __table_args__ = (
-        Index("ix_item_price_history_text", "text_norm"),
         Index("ix_item_price_history_text_currency", "text_norm", "currency"),
+        # Serves baseline lookups (text, org, currency, date range); on PostgreSQL
+        # the included price column allows index-only scans.
+        Index(
+            "ix_iph_norm_org_cur_date",
+            "text_norm",
+            "organization_id",
+            "currency",
+            "invoice_date",
+            postgresql_include=["unit_price"],
+        ),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
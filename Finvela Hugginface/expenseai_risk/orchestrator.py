@@ -53,11 +53,10 @@ def run_risk_pipeline(invoice_id: int, actor: str = "system") -> None:
             "RISK_STARTED",
             {"invoice_id": invoice.id, "actor": actor, "timestamp": datetime.utcnow().isoformat() + "Z"},
         )
-        db.session.commit()
+        # AuditLog.log commits, publishing IN_PROGRESS and RISK_STARTED with the audit entry
         AuditLog.log(action="risk_run_started", entity="invoice", entity_id=invoice.id, data={"actor": actor})
 
         benchmark_service.ingest_invoice_line_items(invoice.id)
-        db.session.commit()
 
         summary = benchmark_service.benchmark_invoice(invoice.id)
         contributors = collect_contributors(invoice.id, benchmark_summary=summary)
@@ -99,7 +98,7 @@ def run_risk_pipeline(invoice_id: int, actor: str = "system") -> None:
                 "policy_version": score.policy_version,
             },
         )
-        db.session.commit()
+        # ingest, score, READY status and events land in the audit entry's commit
         AuditLog.log(
             action="risk_run_completed",
             entity="invoice",